@@ -1,8 +1,8 @@
 # agents/ownership_space_checker.py
+from functools import cached_property
 from schemas.ticket_context import TicketResponse
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
 
 # ✅ Tool function: check if app owner belongs to our space
 def check_owner_space(tickets: TicketResponse, allowed_spaces: list[str]) -> TicketResponse:
@@ -11,41 +11,67 @@ def check_owner_space(tickets: TicketResponse, allowed_spaces: list[str]) -> Tic
     for t in tickets.tickets:
         if t.application_owner and t.application_owner in allowed_spaces:
             valid_tickets.append(t)
-    return TicketResponse(tickets=valid_tickets)
+    return TicketResponse.of(valid_tickets)
 
 class AppOwnerCheckerAgent:
     def __init__(self, llm=None, allowed_spaces=None):
         self.llm = llm
         self.allowed_spaces = allowed_spaces or ["IAM-Space", "Security-Space"]
 
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
         # ✅ Register tool
         tools = [
             Tool(
                 name="CheckOwnerSpace",
-                func=lambda params: check_owner_space(
-                    params.get("tickets"),
+                func=lambda params: tool_artifact(check_owner_space(
+                    tool_input(params, "tickets"),
                     self.allowed_spaces
-                ),
-                description="Filters tickets to only those whose app owner belongs to allowed spaces."
+                )),
+                description="Filters tickets to only those whose app owner belongs to allowed spaces.",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Filter tickets by allowed app owner spaces."
         )
 
+    def run_tool(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return check_owner_space(tickets, self.allowed_spaces)
+
     def invoke(self, tickets: TicketResponse) -> TicketResponse:
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Filter tickets"}], "tickets": tickets})
-        
+        with bound_input(tickets=tickets):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Filter tickets"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Filter tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "CheckOwnerSpace":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
                     try:
                         return TicketResponse.parse_raw(msg.content)
-                    except:
-                        pass
+                    except Exception as e:
+                        record_parse_failure("CheckOwnerSpace")
+                        print(f"Error parsing tool output: {e}")
+        record_parse_failure("CheckOwnerSpace", "no_result")
         return TicketResponse(tickets=[])
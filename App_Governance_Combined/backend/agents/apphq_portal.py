@@ -1,31 +1,31 @@
-import json
 import os
+from functools import cached_property
 from schemas.ticket_context import TicketResponse
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
+from stores.apphq_repository import get_apphq_repository
 
 # ✅ Tool function: enrich tickets with AppHQ ownership details
 def enrich_tickets_with_apphq(data_file: str, tickets: TicketResponse) -> TicketResponse:
     """Lookup AIT numbers in AppHQ data and enrich tickets with ownership details."""
-    with open(data_file, "r") as f:
-        sample_data = json.load(f)
+    # One batched lookup against the shared, indexed AppHQ repository
+    records = get_apphq_repository(data_file).lookup_many(
+        t.ait_number for t in tickets.tickets if t.ait_number
+    )
 
     enriched_tickets = []
     for t in tickets.tickets:
-        if t.ait_number:
-            # find matching record
-            details = next((rec for rec in sample_data if rec["ait_number"] == t.ait_number), None)
-            if details:
-                # enrich ticket fields
-                t.application_name = details.get("application_name")
-                t.application_owner = details.get("application_owner")
-                t.lob_owner = details.get("lob_owner")
-                t.ait_owner = details.get("ait_owner")
-                t.contacts = details.get("contacts", [])
-                enriched_tickets.append(t)
+        details = records.get(t.ait_number)
+        if details:
+            # enrich ticket fields
+            t.application_name = details.get("application_name")
+            t.application_owner = details.get("application_owner")
+            t.lob_owner = details.get("lob_owner")
+            t.ait_owner = details.get("ait_owner")
+            t.contacts = details.get("contacts", [])
+            enriched_tickets.append(t)
 
-    return TicketResponse(tickets=enriched_tickets)
+    return TicketResponse.of(enriched_tickets)
 
 class AppHQResolverAgent:
     def __init__(self, llm=None, data_file=None):
@@ -34,34 +34,60 @@ class AppHQResolverAgent:
             os.path.dirname(__file__), "..", "resources", "apphq_data.json"
         )
 
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
         # ✅ Register tool
         tools = [
             Tool(
                 name="EnrichTicketsWithAppHQ",
-                func=lambda params: enrich_tickets_with_apphq(
-                    self.data_file, params.get("tickets")
-                ),
-                description="Enriches tickets with AppHQ ownership details using AIT number lookup."
+                func=lambda params: tool_artifact(enrich_tickets_with_apphq(
+                    self.data_file, tool_input(params, "tickets")
+                )),
+                description="Enriches tickets with AppHQ ownership details using AIT number lookup.",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Enrich tickets with AppHQ ownership details."
         )
 
+    def run_tool(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return enrich_tickets_with_apphq(self.data_file, tickets)
+
     def invoke(self, tickets: TicketResponse) -> TicketResponse:
         # Pass tickets to agent, which internally calls the tool
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Enrich tickets"}], "tickets": tickets})
-        
+        with bound_input(tickets=tickets):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Enrich tickets"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Enrich tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "EnrichTicketsWithAppHQ":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
                     try:
                         return TicketResponse.parse_raw(msg.content)
-                    except:
-                        pass
+                    except Exception as e:
+                        record_parse_failure("EnrichTicketsWithAppHQ")
+                        print(f"Error parsing tool output: {e}")
+        record_parse_failure("EnrichTicketsWithAppHQ", "no_result")
         return TicketResponse(tickets=[])
@@ -1,7 +1,7 @@
+from functools import cached_property
 from schemas.ticket_context import TicketResponse, Ticket
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
 
 def filter_iam_tickets(tickets: TicketResponse) -> TicketResponse:        
     """Tool function to filter IAM tickets and mark deliverableType."""
@@ -10,33 +10,64 @@ def filter_iam_tickets(tickets: TicketResponse) -> TicketResponse:
         if t.category.upper() == "IAM":
             t.deliverableType = "IAM Category"
             iam_tickets.append(t)
-    return TicketResponse(tickets=iam_tickets)
+    return TicketResponse.of(iam_tickets)
 
 class CategoryCheckerAgent:
     def __init__(self, llm):
+        self.llm = llm
+
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
         # Register the IAM filter tool
         tools = [
             Tool(
                 name="FilterIAMTickets",
-                func=filter_iam_tickets,
-                description="Filters tickets and returns only IAM category tickets"
+                func=lambda params: tool_artifact(filter_iam_tickets(tool_input(params, "tickets"))),
+                description="Filters tickets and returns only IAM category tickets",
+                response_format="content_and_artifact"
             )
         ]
 
         # Create the agent with LLM + tool
-        self.agent = create_agent(
-            model=llm,
+        return create_agent(
+            model=self.llm,
             tools=tools,
             context_schema= TicketResponse,
             system_prompt="Filter the tickets to only IAM category."
         )
 
+    def run_tool(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return filter_iam_tickets(tickets)
+
     def invoke(self, tickets: TicketResponse) -> TicketResponse:
         # Call the agent with your ticket context
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Filter IAM tickets"}], "tickets": tickets})
-        
+        with bound_input(tickets=tickets):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Filter IAM tickets"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Filter IAM tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "FilterIAMTickets":
-                    return TicketResponse.parse_raw(msg.content)
-        return TicketResponse(tickets=[])
\ No newline at end of file
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
+                    try:
+                        return TicketResponse.parse_raw(msg.content)
+                    except Exception:
+                        record_parse_failure("FilterIAMTickets")
+                        raise
+        record_parse_failure("FilterIAMTickets", "no_result")
+        return TicketResponse(tickets=[])
@@ -1,8 +1,8 @@
 # agents/closer.py
+from functools import cached_property
 from schemas.ticket_context import TicketResponse, Ticket
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
 
 # ✅ Tool function: close tickets by appending evidence message
 def close_tickets(tickets: TicketResponse) -> TicketResponse:
@@ -11,38 +11,64 @@ def close_tickets(tickets: TicketResponse) -> TicketResponse:
     for t in tickets.tickets:
         t.description = (t.description or "") + " | Evidence attached, ticket closed."
         updated.append(t)
-    return TicketResponse(tickets=updated)
+    return TicketResponse.of(updated)
 
 class CloserAgent:
     def __init__(self, llm=None):
         self.llm = llm
 
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
         # ✅ Register tool
         tools = [
             Tool(
                 name="CloseTickets",
-                func=lambda params: close_tickets(params.get("tickets")),
-                description="Closes tickets by appending evidence message to description."
+                func=lambda params: tool_artifact(close_tickets(tool_input(params, "tickets"))),
+                description="Closes tickets by appending evidence message to description.",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Close the tickets by appending evidence."
         )
 
+    def run_tool(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return close_tickets(tickets)
+
     def invoke(self, tickets: TicketResponse) -> TicketResponse:
         # Pass tickets to agent, which internally calls the tool
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Close tickets"}], "tickets": tickets})
-        
+        with bound_input(tickets=tickets):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Close tickets"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Close tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "CloseTickets":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
                     try:
                         return TicketResponse.parse_raw(msg.content)
-                    except:
-                        pass
+                    except Exception as e:
+                        record_parse_failure("CloseTickets")
+                        print(f"Error parsing tool output: {e}")
+        record_parse_failure("CloseTickets", "no_result")
         return TicketResponse(tickets=[])
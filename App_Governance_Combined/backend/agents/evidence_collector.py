@@ -1,69 +1,62 @@
 # agents/evidence_collector.py
-import smtplib
-import json
-import os
-from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from config.loader import get_config
 from schemas.ticket_context import TicketResponse
+from evidence.dispatcher import EvidenceDispatcher
+from evidence.templates import EvidenceTemplateRenderer
 
 class EvidenceCollectorAgent:
-    def __init__(self, llm=None, config_file=None):
+    def __init__(self, llm=None, config_file=None, config=None):
         self.llm = llm
-        # Load config.json
-        self.config_file = config_file or os.path.join(
-            os.path.dirname(__file__), "..", "config", "config.json"
-        )
-        with open(self.config_file, "r") as f:
-            config = json.load(f)
+        # ✅ Shared parsed config.json (the orchestrator passes its own)
+        config = config if config is not None else get_config(config_file)
         self.smtp_config = config["smtp"]
+        self.renderer = EvidenceTemplateRenderer(
+            config.get("evidence_templates", {}), sender=self.smtp_config["user"]
+        )
+        self._dispatcher = None
+
+    @property
+    def dispatcher(self) -> EvidenceDispatcher:
+        # ✅ Pooled SMTP sessions are only opened once something is actually sent
+        if self._dispatcher is None:
+            self._dispatcher = EvidenceDispatcher(self.smtp_config)
+        return self._dispatcher
 
     def prepare_email(self, ticket) -> MIMEMultipart:
-        msg = MIMEMultipart()
-        msg["From"] = self.smtp_config["user"]
-        # Determine recipient: prefer application_owner, then first contact, then default
-        recipient = ticket.application_owner
-        if not recipient and ticket.contacts:
-            recipient = ticket.contacts[0]
-        
-        msg["To"] = recipient or "app_owner@example.com"
-        msg["Subject"] = f"IAM Deliverable {ticket.ticket_id} – Evidence Required"
+        return self.renderer.to_mime(self.renderer.render(ticket))
 
-        body = f"""
-        Dear Owner,
+    def send_email(self, msg: MIMEMultipart):
+        return self.dispatcher.send(None, msg)["status"] == "sent"
 
-        Please provide completion evidence for deliverable {ticket.ticket_id} ({ticket.description}).
-        SLA Deadline: {ticket.sla_deadline}
-        Risk Level: {ticket.risk_level}
+    def run_tool(self, tickets: TicketResponse, send=False) -> dict:
+        # ✅ Evidence collection never goes through the LLM, so both modes are the same
+        return self.invoke(tickets, send=send)
 
-        Regards,
-        IAM Governance Team
-        """
-        msg.attach(MIMEText(body, "plain"))
-        return msg
-
-    def send_email(self, msg: MIMEMultipart):
-        try:
-            with smtplib.SMTP(self.smtp_config["server"], self.smtp_config["port"]) as server:
-                if self.smtp_config.get("use_tls", True):
-                    server.starttls()
-                server.login(self.smtp_config["user"], self.smtp_config["password"])
-                server.send_message(msg)
-            return True
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            return False
+    async def arun_tool(self, tickets: TicketResponse, send=False) -> dict:
+        return await self.ainvoke(tickets, send=send)
 
     def invoke(self, tickets: TicketResponse, send=False) -> dict:
-        emails = []
-        for t in tickets.tickets:
-            msg = self.prepare_email(t)
-            if send:
-                status = self.send_email(msg)
-                emails.append({"ticket_id": t.ticket_id, "status": "sent" if status else "failed"})
-            else:
-                emails.append({
-                    "to": [msg["To"]],
-                    "subject": msg["Subject"],
-                    "body": msg.get_payload()[0].get_payload()
-                })
-        return {"emails": emails}
+        # ✅ Render every ticket's email in one pass from precompiled templates
+        rendered = self.renderer.render_batch(tickets)
+        if send:
+            # ✅ Concurrent delivery over pooled sessions, one report per ticket
+            return {"emails": self.dispatcher.dispatch(self._messages(rendered))}
+        return self._preview(rendered)
+
+    async def ainvoke(self, tickets: TicketResponse, send=False) -> dict:
+        rendered = self.renderer.render_batch(tickets)
+        if send:
+            # ✅ Await the pooled SMTP sends instead of blocking on them
+            return {"emails": await self.dispatcher.dispatch_async(self._messages(rendered))}
+        return self._preview(rendered)
+
+    def _messages(self, rendered: list) -> list:
+        return [(email["ticket_id"], self.renderer.to_mime(email)) for email in rendered]
+
+    def _preview(self, rendered: list) -> dict:
+        # Preview mode: rendered strings only, no MIME round trip
+        return {"emails": [
+            {"to": email["to"], "subject": email["subject"], "body": email["body"]}
+            for email in rendered
+        ]}
@@ -1,6 +1,8 @@
 # agents/human_approval.py
+from functools import cached_property
 from schemas.ticket_context import TicketResponse
-from langchain.agents import create_agent
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
 
 def require_human_approval(tickets: TicketResponse, stage: str) -> dict:
     """Flag tickets for human review before proceeding."""
@@ -10,8 +12,6 @@ def require_human_approval(tickets: TicketResponse, stage: str) -> dict:
         "status": "pending_human_review"
     }
 
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
 import json
 
 # ...
@@ -19,25 +19,52 @@ import json
 class HumanApprovalAgent:
     def __init__(self, llm=None):
         self.llm = llm
+
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
         tools = [
             Tool(
                 name="RequireHumanApproval",
-                func=lambda params: require_human_approval(
-                    params.get("tickets"), params.get("stage")
-                ),
-                description="Flags tickets for human review at a given stage."
+                func=lambda params: tool_artifact(require_human_approval(
+                    tool_input(params, "tickets"), tool_input(params, "stage")
+                )),
+                description="Flags tickets for human review at a given stage.",
+                response_format="content_and_artifact"
             )
         ]
-        self.agent = create_agent(model=self.llm, tools=tools, context_schema=TicketResponse, system_prompt="Check if human approval is required.")
+        return create_agent(model=self.llm, tools=tools, context_schema=TicketResponse, system_prompt="Check if human approval is required.")
+
+    def run_tool(self, tickets: TicketResponse, stage: str) -> dict:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return require_human_approval(tickets, stage)
 
     def invoke(self, tickets: TicketResponse, stage: str) -> dict:
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Check approval"}], "tickets": tickets, "stage": stage})
-        
+        with bound_input(tickets=tickets, stage=stage):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Check approval"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse, stage: str) -> dict:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets, stage=stage):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Check approval"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> dict:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "RequireHumanApproval":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, dict):
+                        return msg.artifact
                     try:
                         return json.loads(msg.content)
                     except Exception as e:
+                        record_parse_failure("RequireHumanApproval")
                         print(f"Error parsing approval: {e}")
+        record_parse_failure("RequireHumanApproval", "no_result")
         return {}
@@ -1,60 +1,92 @@
 # agents/logger.py
+from functools import cached_property
 from schemas.ticket_context import TicketResponse
-from datetime import datetime
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
+from audit.log import audit_record
 import json
 
-# ✅ Tool function: generate logs
+# ✅ Tool function: generate logs as structured audit records
 def generate_logs(tickets: TicketResponse, message: str = None) -> dict:
-    """Generate logs for tickets or custom messages."""
+    """Generate audit records for tickets or custom messages."""
     logs = []
     if message:
-        logs.append(f"[{datetime.utcnow().isoformat()}] {message}")
+        logs.append(audit_record(None, "logger", "message", message=message))
     elif not tickets.tickets:
-        logs.append(f"[{datetime.utcnow().isoformat()}] No tickets found for processing.")
+        logs.append(audit_record(None, "logger", "empty", message="No tickets found for processing."))
     else:
         for t in tickets.tickets:
-            logs.append(
-                f"[{datetime.utcnow().isoformat()}] Processed ticket {t.ticket_id} "
-                f"with risk {t.risk_level or 'Unknown'}"
-            )
+            logs.append(audit_record(
+                t.ticket_id, "logger", "processed",
+                message=f"Processed ticket {t.ticket_id} with risk {t.risk_level or 'Unknown'}",
+                risk_level=t.risk_level or "Unknown"
+            ))
     return {"logs": logs}
 
 class LoggerAgent:
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, audit_log=None):
         self.llm = llm
+        # ✅ Records are also appended to the audit log sink when one is given
+        self.audit_log = audit_log
+
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
 
         # ✅ Register tool
         tools = [
             Tool(
                 name="GenerateLogs",
-                func=lambda params: generate_logs(
-                    params.get("tickets"),
-                    params.get("message")
-                ),
-                description="Generates logs for tickets or custom failure messages."
+                func=lambda params: tool_artifact(self.run_tool(
+                    tool_input(params, "tickets"),
+                    tool_input(params, "message")
+                )),
+                description="Generates logs for tickets or custom failure messages.",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Generate logs for the tickets."
         )
 
+    def run_tool(self, tickets: TicketResponse, message: str = None) -> dict:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        logs = generate_logs(tickets, message)
+        if self.audit_log is not None:
+            self.audit_log.write(*logs["logs"])
+        return logs
+
     def invoke(self, tickets: TicketResponse, message: str = None) -> dict:
         # Pass tickets + message to agent
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Generate logs"}], "tickets": tickets, "message": message})
-        
+        with bound_input(tickets=tickets, message=message):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Generate logs"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse, message: str = None) -> dict:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets, message=message):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Generate logs"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> dict:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "GenerateLogs":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, dict):
+                        return msg.artifact
                     try:
                         return json.loads(msg.content)
                     except Exception as e:
+                        record_parse_failure("GenerateLogs")
                         print(f"Error parsing logs: {e}")
+        record_parse_failure("GenerateLogs", "no_result")
         return {"logs": []}
@@ -1,9 +1,10 @@
 # agents/sla_prioritizer.py
+from functools import cached_property
 from schemas.ticket_context import TicketResponse, Ticket
+from metrics.registry import record_parse_failure
+from agents.tool_output import bound_input, tool_artifact, tool_input
 from datetime import datetime
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from pipeline.sla_engine import SLAEngine
 
 # ✅ Tool function: calculate SLA risk levels
 def prioritize_tickets_by_sla(tickets: TicketResponse) -> TicketResponse:
@@ -22,38 +23,66 @@ def prioritize_tickets_by_sla(tickets: TicketResponse) -> TicketResponse:
         except Exception:
             t.risk_level = "Unknown"
         updated.append(t)
-    return TicketResponse(tickets=updated)
+    return TicketResponse.of(updated)
 
 class SLAPrioritizerAgent:
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, sla_config=None):
         self.llm = llm
+        # ✅ Vectorized batch scorer (thresholds / business days from config.json)
+        self.engine = SLAEngine(sla_config)
 
-        # ✅ Register tool
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
+
+        # ✅ Register tool; it scores with the same engine (and config) as direct mode
         tools = [
             Tool(
                 name="PrioritizeTicketsBySLA",
-                func=lambda params: prioritize_tickets_by_sla(params.get("tickets")),
-                description="Assigns risk levels (High/Medium/Low) to tickets based on SLA deadlines."
+                func=lambda params: tool_artifact(self.engine.prioritize(tool_input(params, "tickets"))),
+                description="Assigns risk levels (High/Medium/Low) to tickets based on SLA deadlines.",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Prioritize tickets based on SLA."
         )
 
+    def run_tool(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Direct mode: score the whole batch without the LLM round trip
+        return self.engine.prioritize(tickets)
+
     def invoke(self, tickets: TicketResponse) -> TicketResponse:
         # Pass tickets to agent, which internally calls the tool
-        result = self.agent.invoke({"messages": [{"role": "user", "content": "Prioritize tickets"}], "tickets": tickets})
-        
+        with bound_input(tickets=tickets):
+            result = self.agent.invoke({"messages": [{"role": "user", "content": "Prioritize tickets"}]})
+        return self._parse_result(result)
+
+    async def ainvoke(self, tickets: TicketResponse) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        with bound_input(tickets=tickets):
+            result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Prioritize tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "PrioritizeTicketsBySLA":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
                     try:
                         return TicketResponse.parse_raw(msg.content)
-                    except:
-                        pass
+                    except Exception as e:
+                        record_parse_failure("PrioritizeTicketsBySLA")
+                        print(f"Error parsing tool output: {e}")
+        record_parse_failure("PrioritizeTicketsBySLA", "no_result")
         return TicketResponse(tickets=[])
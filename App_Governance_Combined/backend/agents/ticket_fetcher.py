@@ -1,9 +1,11 @@
+import asyncio
 import json
 import os
+from functools import cached_property
+from typing import Iterator
 from schemas.ticket_context import TicketResponse, Ticket
-from langchain.agents import create_agent
-from langchain_core.tools import Tool
-from langchain_core.messages import ToolMessage
+from metrics.registry import record_parse_failure
+from agents.tool_output import tool_artifact
 
 # ✅ Tool function for filtering IAM tickets
 def fetch_iam_tickets(data_file: str) -> TicketResponse:
@@ -12,43 +14,160 @@ def fetch_iam_tickets(data_file: str) -> TicketResponse:
         sample_data = json.load(f)
 
     iam_tickets = [Ticket(**t) for t in sample_data if t["category"].upper() == "IAM"]
-    return TicketResponse(tickets=iam_tickets)
+    return TicketResponse.of(iam_tickets)
+
+READ_BLOCK_SIZE = 64 * 1024
+
+def detect_data_format(data_file: str) -> str:
+    """Return "ndjson" for .ndjson/.jsonl files, otherwise "json"."""
+    ext = os.path.splitext(data_file)[1].lower()
+    return "ndjson" if ext in (".ndjson", ".jsonl") else "json"
+
+def _iter_json_array(f) -> Iterator[dict]:
+    """Incrementally decode the items of a top-level JSON array."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        block = f.read(READ_BLOCK_SIZE)
+        if not block:
+            eof = True
+        buf = buf[pos:] + block
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip(" \t\r\n")
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("Expected a JSON array of tickets")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array of tickets")
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # A value ending exactly at the buffer edge may be cut short (e.g. a number)
+        if end == len(buf) and not eof:
+            fill()
+            continue
+        pos = end
+        yield item
+
+def iter_ticket_records(data_file: str, data_format: str = None) -> Iterator[dict]:
+    """Yield raw ticket dicts from a JSON array or NDJSON file one at a time."""
+    data_format = data_format or detect_data_format(data_file)
+    with open(data_file, "r") as f:
+        if data_format == "ndjson":
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        elif data_format == "json":
+            yield from _iter_json_array(f)
+        else:
+            raise ValueError(f"Unsupported ticket data format: {data_format}")
+
+def stream_iam_tickets(data_file: str, chunk_size: int = 500, data_format: str = None) -> Iterator[TicketResponse]:
+    """Stream IAM tickets from disk in TicketResponse chunks of at most chunk_size."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    chunk = []
+    for record in iter_ticket_records(data_file, data_format):
+        if record["category"].upper() == "IAM":
+            chunk.append(Ticket(**record))
+            if len(chunk) >= chunk_size:
+                yield TicketResponse.of(chunk)
+                chunk = []
+    if chunk:
+        yield TicketResponse.of(chunk)
 
 class TicketFetcherAgent:
-    def __init__(self, llm=None, data_file=None):
+    def __init__(self, llm=None, data_file=None, chunk_size=500, data_format=None):
         self.llm = llm
         self.data_file = data_file or os.path.join(
             os.path.dirname(__file__), "..", "resources", "ticket_data.json"
         )
+        self.chunk_size = chunk_size
+        self.data_format = data_format
+
+    @cached_property
+    def agent(self):
+        # ✅ The LangChain graph is only built when the stage runs in agent mode
+        from langchain.agents import create_agent
+        from langchain_core.tools import Tool
 
         # ✅ Register tool
         tools = [
             Tool(
                 name="FetchIAMTickets",
-                func=lambda _: fetch_iam_tickets(self.data_file),
-                description="Fetches tickets from JSON and filters IAM category tickets"
+                func=lambda _: tool_artifact(fetch_iam_tickets(self.data_file)),
+                description="Fetches tickets from JSON and filters IAM category tickets",
+                response_format="content_and_artifact"
             )
         ]
 
         # ✅ Create agent with LLM + tool
-        self.agent = create_agent(
+        return create_agent(
             model=self.llm,
             tools=tools,
             context_schema=TicketResponse,
             system_prompt="Fetch the IAM tickets using the provided tool."
         )
 
+    def run_tool(self) -> TicketResponse:
+        # ✅ Direct mode: call the tool function without the LLM round trip
+        return fetch_iam_tickets(self.data_file)
+
+    async def arun_tool(self) -> TicketResponse:
+        # File reads stay off the event loop
+        return await asyncio.to_thread(fetch_iam_tickets, self.data_file)
+
+    def iter_chunks(self, chunk_size: int = None) -> Iterator[TicketResponse]:
+        # ✅ Streaming mode: yield tickets in bounded chunks instead of one big load
+        return stream_iam_tickets(self.data_file, chunk_size or self.chunk_size, self.data_format)
+
     def invoke(self) -> TicketResponse:
         # ✅ Call the agent, which internally uses the tool
         result = self.agent.invoke({"messages": [{"role": "user", "content": "Fetch IAM tickets"}]})
-        
+        return self._parse_result(result)
+
+    async def ainvoke(self) -> TicketResponse:
+        # ✅ Async path: the LLM round trip doesn't hold a thread
+        result = await self.agent.ainvoke({"messages": [{"role": "user", "content": "Fetch IAM tickets"}]})
+        return self._parse_result(result)
+
+    def _parse_result(self, result) -> TicketResponse:
+        from langchain_core.messages import ToolMessage
         # Extract result from ToolMessage
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
                 if isinstance(msg, ToolMessage) and msg.name == "FetchIAMTickets":
+                    # ✅ Live tool output: no JSON round trip or re-validation
+                    if isinstance(msg.artifact, TicketResponse):
+                        return msg.artifact
                     try:
                         return TicketResponse.parse_raw(msg.content)
                     except Exception as e:
+                        record_parse_failure("FetchIAMTickets")
                         print(f"Error parsing tool output: {e}")
-        
+        record_parse_failure("FetchIAMTickets", "no_result")
         return TicketResponse(tickets=[])
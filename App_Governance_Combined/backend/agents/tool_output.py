@@ -0,0 +1,36 @@
+# agents/tool_output.py
+import contextlib
+import contextvars
+
+from schemas.ticket_context import TicketResponse
+
+# ✅ The live input of the agent call in progress. Tools read the ticket batch
+#    from here instead of having the LLM echo it back as JSON arguments.
+agent_input = contextvars.ContextVar("agent_input", default=None)
+
+@contextlib.contextmanager
+def bound_input(**values):
+    """Make the stage input visible to the agent's tools for this call."""
+    token = agent_input.set(values)
+    try:
+        yield
+    finally:
+        agent_input.reset(token)
+
+def tool_input(params, key: str):
+    """The live stage input for key, or what the model passed if there is none."""
+    values = agent_input.get()
+    if values is not None and key in values:
+        return values[key]
+    return params.get(key) if isinstance(params, dict) else params
+
+def tool_artifact(output) -> tuple:
+    """(content, artifact) for ``response_format="content_and_artifact"`` tools.
+
+    The model only sees a short summary; the output object itself rides on
+    ``ToolMessage.artifact`` and is handed to the next stage as is.
+    """
+    if isinstance(output, TicketResponse):
+        return f"{len(output.tickets)} tickets", output
+    counts = [f"{len(value)} {key}" for key, value in output.items() if isinstance(value, (list, dict))]
+    return ", ".join(counts) or "done", output
@@ -1,14 +1,45 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
+import base64
+import hashlib
 import json
 import os
+import sys
+import uuid
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from datetime import datetime, timezone
+_framework_imported = time.perf_counter()
+
 from orchestrator import IAMOrchestrator
 from schemas.ticket_context import Ticket, TicketResponse
-from datetime import datetime
+from stores.apphq_repository import get_apphq_repository
+from pipeline.batch_scheduler import BatchScheduler
+from pipeline.stage_executor import StageExecutor
+from pipeline.priority_queue import SLAPriorityQueue
+from pipeline.review_queue import REVIEW_ORDERS, ReviewQueue
+from pipeline.incremental import FINGERPRINTED_STAGES
+from realtime.event_stream import EventStream
+from realtime.connection_manager import ConnectionManager
+from realtime.json_codec import EncodedJSONResponse, FastJSONResponse, TicketJSONCache, join_object
+from stores.ticket_state import TicketStateStore, create_ticket_state_store
+from metrics.registry import REGISTRY, TICKET_STAGE_LATENCY, TICKETS_PROCESSED
+
+# ✅ Startup cost breakdown, served at /api/pipeline/startup
+startup_report = {
+    "imports": {
+        "framework_ms": round((_framework_imported - _import_started) * 1000, 3),
+        "app_modules_ms": round((time.perf_counter() - _framework_imported) * 1000, 3),
+    },
+    "phases": {},
+    "initial_load": "pending",
+}
 
 load_dotenv()
 
@@ -24,30 +55,34 @@ app.add_middleware(
 )
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+manager = ConnectionManager()
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+# Encoded JSON per ticket for GET /api/tickets and WebSocket snapshots
+ticket_json = TicketJSONCache()
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+# Global state
+# Replaced by the configured state store (memory or SQLite) on startup
+current_tickets: TicketStateStore = TicketStateStore()
+orchestrator: Optional[IAMOrchestrator] = None
+batch_scheduler: Optional[BatchScheduler] = None
+stage_executor: Optional[StageExecutor] = None
+event_stream: Optional[EventStream] = None
+initial_load_task: Optional[asyncio.Task] = None
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}")
+# Tickets waiting for process_individual_ticket, most urgent SLA first
+ticket_queue = SLAPriorityQueue()
+active_ticket_jobs = set()
+# Tickets taken off ticket_queue whose per-ticket job hasn't finished yet
+active_ticket_ids = set()
+# Tickets paused at the evidence stage until a reviewer approves them
+review_queue = ReviewQueue()
+ticket_seconds_avg: Optional[float] = None
 
-manager = ConnectionManager()
+class BatchProcessRequest(BaseModel):
+    ticket_ids: Optional[List[str]] = None
 
-# Global state
-current_tickets: Dict[str, Any] = {}
-orchestrator: Optional[IAMOrchestrator] = None
+class ReviewApprovalRequest(BaseModel):
+    ticket_ids: List[str]
 
 def get_orchestrator():
     global orchestrator
@@ -55,9 +90,57 @@ def get_orchestrator():
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             print("⚠️ WARNING: OPENAI_API_KEY not found in environment variables")
+        start = time.perf_counter()
         orchestrator = IAMOrchestrator(api_key, config_file="config/config.json")
+        startup_report["phases"]["orchestrator_ms"] = round((time.perf_counter() - start) * 1000, 3)
     return orchestrator
 
+def get_stage_executor() -> StageExecutor:
+    global stage_executor
+    if stage_executor is None:
+        executor_config = get_orchestrator().config.get("executor", {})
+        stage_executor = StageExecutor(
+            stage_concurrency=executor_config.get("stage_concurrency", {}),
+            default_concurrency=executor_config.get("default_concurrency", 4),
+            max_queue=executor_config.get("max_queue", 200),
+            max_workers=executor_config.get("max_workers"),
+            stages=["fetcher", *(spec["stage"] for spec in PIPELINE_STAGES.values())]
+        )
+    return stage_executor
+
+def get_event_stream() -> EventStream:
+    global event_stream
+    if event_stream is None:
+        events_config = get_orchestrator().config.get("events", {})
+        event_stream = EventStream(capacity=events_config.get("buffer_size", 10000))
+    return event_stream
+
+def queue_depths() -> dict:
+    depths = {("priority",): len(ticket_queue), ("active_tickets",): len(active_ticket_jobs),
+              ("review",): len(review_queue)}
+    if stage_executor is not None:
+        depths[("executor",)] = stage_executor.stats()["pending_jobs"]
+    if batch_scheduler is not None:
+        depths[("batch",)] = batch_scheduler.pending()
+    return depths
+
+def stage_waiting() -> dict:
+    if stage_executor is None:
+        return {}
+    return {(stage,): stats["waiting"] for stage, stats in stage_executor.stats()["stages"].items()}
+
+# ✅ Scrape-time gauges for queues and WebSocket clients
+REGISTRY.gauge("iam_queue_depth", "Tickets or jobs waiting in each queue", ("queue",), callback=queue_depths)
+REGISTRY.gauge("iam_stage_waiting", "Calls waiting for a stage executor slot", ("stage",), callback=stage_waiting)
+REGISTRY.gauge("iam_review_oldest_seconds", "How long the oldest ticket has been waiting for review",
+               callback=lambda: review_queue.oldest_age())
+REGISTRY.gauge("iam_websocket_clients", "Connected WebSocket clients", callback=lambda: len(manager.active_connections))
+REGISTRY.gauge("iam_websocket_dropped_clients", "WebSocket clients dropped for falling behind",
+               callback=lambda: manager.dropped_clients)
+
+def queue_full_response(message: str) -> JSONResponse:
+    return JSONResponse(status_code=429, content={"error": message}, headers={"Retry-After": "1"})
+
 def convert_ticket_to_frontend(ticket: Ticket) -> dict:
     """Convert Pydantic Ticket model to frontend dictionary format"""
     return {
@@ -65,11 +148,13 @@ def convert_ticket_to_frontend(ticket: Ticket) -> dict:
         "title": ticket.description[:50] + "..." if len(ticket.description) > 50 else ticket.description,
         "description": ticket.description,
         "customer": ticket.application_owner or "Unknown",
+        "applicationOwner": ticket.application_owner,
         "priority": ticket.risk_level.lower() if ticket.risk_level else "medium",
         "status": "not-started",
         "createdAt": ticket.created_on,
         "currentStage": 0,
         "category": ticket.category,
+        "deliverableType": ticket.deliverableType,
         "slaDeadline": ticket.sla_deadline,
         "aitNumber": ticket.ait_number,
         "applicationName": ticket.application_name,
@@ -94,10 +179,11 @@ def convert_frontend_to_ticket(data: dict) -> Ticket:
     return Ticket(
         ticket_id=data["id"],
         description=data["description"],
-        application_owner=data["customer"],
+        application_owner=data.get("applicationOwner") or data["customer"],
         risk_level=data["priority"].upper(),
         created_on=data["createdAt"],
         category=data.get("category"),
+        deliverableType=data.get("deliverableType", ""),
         sla_deadline=data.get("slaDeadline"),
         ait_number=data.get("aitNumber"),
         application_name=data.get("applicationName"),
@@ -107,8 +193,8 @@ def convert_frontend_to_ticket(data: dict) -> Ticket:
         contacts=data.get("contacts", [])
     )
 
-async def update_stage_progress(ticket_id: str, stage_index: int, status: str, message: str):
-    """Update ticket stage progress and broadcast to WebSocket clients"""
+def apply_stage_progress(ticket_id: str, stage_index: int, status: str, message: str) -> Optional[dict]:
+    """Update ticket stage progress and return the delta event to broadcast"""
     if ticket_id in current_tickets:
         current_tickets[ticket_id]["currentStage"] = stage_index
         current_tickets[ticket_id]["stages"][stage_index]["status"] = status
@@ -118,11 +204,133 @@ async def update_stage_progress(ticket_id: str, stage_index: int, status: str, m
             current_tickets[ticket_id]["status"] = "in-progress"
         elif status == "completed" and stage_index == 7:
             current_tickets[ticket_id]["status"] = "completed"
+            # A refresh reruns from the ticket itself, so the kept stage outputs are no longer needed
+            get_orchestrator().fingerprints.forget_outputs([ticket_id])
+        current_tickets.mark_dirty(ticket_id)
+        ticket_json.invalidate(ticket_id)
         
-        await manager.broadcast({
-            "type": "ticket_update",
-            "ticket": current_tickets[ticket_id]
-        })
+        # ✅ Only the changed fields and stage, tagged with a sequence number
+        return get_event_stream().ticket_delta(current_tickets[ticket_id], stage_index)
+    return None
+
+async def update_stage_progress(ticket_id: str, stage_index: int, status: str, message: str):
+    """Update ticket stage progress and broadcast to WebSocket clients"""
+    event = apply_stage_progress(ticket_id, stage_index, status, message)
+    if event is not None:
+        await manager.broadcast(event)
+
+# ✅ Pipeline stage table shared by single-ticket and batched processing
+# stage_index -> orchestrator stage, in-progress message, error message when the
+# agent drops the ticket (None means the ticket simply moves on)
+PIPELINE_STAGES = {
+    1: {"stage": "categorizer", "progress": "Agent: Checking category...", "error": "Category check failed"},
+    2: {"stage": "sla", "progress": "Agent: Calculating SLA...", "error": None},
+    3: {"stage": "ownership", "progress": "Agent: Fetching ownership...", "error": None},
+    4: {"stage": "app_space_checker", "progress": "Agent: Verifying app owner...", "error": "App owner verification failed"},
+    5: {"stage": "evidence", "progress": "Agent: Preparing evidence emails...", "error": None},
+    6: {"stage": "closer", "progress": "Agent: Closing ticket...", "error": None},
+    7: {"stage": "logger", "progress": "Agent: Logging results...", "error": None},
+}
+REVIEW_STAGE = 5
+LAST_STAGE = 7
+STAGE_INDEX = {spec["stage"]: stage_index for stage_index, spec in PIPELINE_STAGES.items()}
+
+# Fields that come straight from ticket_data.json, copied over on refresh
+RAW_TICKET_FIELDS = ("title", "description", "category", "slaDeadline", "aitNumber", "armId", "createdAt")
+
+def apply_stage_result(stage_index: int, ticket_id: str, ticket_obj: Ticket) -> str:
+    """Copy a stage's output onto the frontend ticket and return the completion message"""
+    ticket = current_tickets[ticket_id]
+    if stage_index == 1:
+        ticket["category"] = ticket_obj.category
+        return f"Category: {ticket_obj.category}"
+    if stage_index == 2:
+        ticket["slaDeadline"] = ticket_obj.sla_deadline
+        ticket["priority"] = ticket_obj.risk_level.lower()
+        ticket_queue.update(ticket_id, ticket["slaDeadline"], ticket["priority"])
+        return f"SLA: {ticket_obj.sla_deadline}"
+    if stage_index == 3:
+        ticket["lobOwner"] = ticket_obj.lob_owner
+        ticket["applicationName"] = ticket_obj.application_name
+        ticket["applicationOwner"] = ticket_obj.application_owner
+        ticket["contacts"] = ticket_obj.contacts
+        return f"Owner: {ticket_obj.lob_owner}"
+    if stage_index == 4:
+        return "App owner verified"
+    if stage_index == 6:
+        return "Ticket closed"
+    return "Logged successfully"
+
+async def call_stage(stage: str, *args, **kwargs):
+    """Run an orchestrator stage: agent mode awaits ainvoke, direct mode uses the thread pool"""
+    orch = get_orchestrator()
+    if orch.stage_mode(stage) == "agent":
+        return await get_stage_executor().run_async(stage, orch.arun_stage, stage, *args, **kwargs)
+    return await get_stage_executor().run(stage, orch.run_stage, stage, *args, **kwargs)
+
+def record_ticket_stage(stage: str, started: float, outcomes: Dict[str, int]):
+    """Per-ticket stage latency and outcome counts for /metrics"""
+    elapsed = time.perf_counter() - started
+    for outcome, count in outcomes.items():
+        if count:
+            TICKETS_PROCESSED.inc(count, stage=stage, outcome=outcome)
+            for _ in range(count):
+                TICKET_STAGE_LATENCY.observe(elapsed, stage=stage)
+
+async def run_stage_for_tickets(stage_index: int, tickets: List[Tuple[str, Ticket]]) -> List[Tuple[str, Ticket]]:
+    """Run one pipeline stage once for a group of tickets and fan the results out.
+
+    Returns the (ticket_id, ticket) pairs that should continue to the next stage.
+    """
+    spec = PIPELINE_STAGES[stage_index]
+    tickets = [(ticket_id, t) for ticket_id, t in tickets if ticket_id in current_tickets]
+    if not tickets:
+        return []
+
+    started = time.perf_counter()
+    for ticket_id, _ in tickets:
+        await update_stage_progress(ticket_id, stage_index, "in-progress", spec["progress"])
+    ticket_context = TicketResponse.of([t for _, t in tickets])
+
+    # Stage 5: Evidence Collection (PAUSE FOR REVIEW)
+    if stage_index == REVIEW_STAGE:
+        # Call agent to generate emails but don't send yet (non-blocking)
+        await call_stage(spec["stage"], ticket_context, send=False)
+        audit_log = get_orchestrator().audit_log
+        for ticket_id, _ in tickets:
+            # Mark as waiting for review
+            start_review(ticket_id)
+            audit_log.record(ticket_id, spec["stage"], "waiting_for_review")
+            await update_stage_progress(ticket_id, stage_index, "in-progress", "⏸️ Waiting for application team review...")
+        record_ticket_stage(spec["stage"], started, {"review": len(tickets)})
+        return [] # Stop for review
+
+    # Call real agent (non-blocking)
+    result = await call_stage(spec["stage"], ticket_context)
+
+    # Stage 7: Logging always completes
+    if stage_index == LAST_STAGE:
+        for ticket_id, _ in tickets:
+            await update_stage_progress(ticket_id, stage_index, "completed", apply_stage_result(stage_index, ticket_id, None))
+            current_tickets[ticket_id]["status"] = "completed"
+        record_ticket_stage(spec["stage"], started, {"completed": len(tickets)})
+        return tickets
+
+    results = {t.ticket_id: t for t in result.tickets}
+    advanced = []
+    for ticket_id, ticket_obj in tickets:
+        updated = results.get(ticket_obj.ticket_id)
+        if updated is not None:
+            await update_stage_progress(ticket_id, stage_index, "completed", apply_stage_result(stage_index, ticket_id, updated))
+            advanced.append((ticket_id, updated))
+        elif spec["error"]:
+            await update_stage_progress(ticket_id, stage_index, "error", spec["error"])
+        else:
+            advanced.append((ticket_id, ticket_obj))
+    record_ticket_stage(spec["stage"], started, {
+        "completed": len(advanced), "error": len(tickets) - len(advanced)
+    })
+    return advanced
 
 async def process_individual_ticket(ticket_id: str):
     """Process a single ticket through the real agent pipeline"""
@@ -130,109 +338,24 @@ async def process_individual_ticket(ticket_id: str):
         if ticket_id not in current_tickets:
             return
         
-        orch = get_orchestrator()
-        ticket_data = current_tickets[ticket_id]
-        current_stage = ticket_data["currentStage"]
+        current_stage = current_tickets[ticket_id]["currentStage"]
         
         # Convert to Pydantic model for agents
-        ticket_obj = convert_frontend_to_ticket(ticket_data)
-        ticket_context = TicketResponse(tickets=[ticket_obj])
+        tickets = [(ticket_id, convert_frontend_to_ticket(current_tickets[ticket_id]))]
         
         await manager.broadcast({
             "type": "processing_start",
             "message": f"Processing ticket {ticket_id} with AI Agents..."
         })
         
-        # Stage 1: Category Check
-        if current_stage < 1:
-            await update_stage_progress(ticket_id, 1, "in-progress", "Agent: Checking category...")
-            # Call real agent (non-blocking)
-            result = await asyncio.to_thread(orch.categorizer.invoke, ticket_context)
-            if result.tickets:
-                ticket_obj = result.tickets[0]
-                current_tickets[ticket_id]["category"] = ticket_obj.category
-                await update_stage_progress(ticket_id, 1, "completed", f"Category: {ticket_obj.category}")
-            else:
-                await update_stage_progress(ticket_id, 1, "error", "Category check failed")
-                return
-            current_stage = 1
-            
-        # Stage 2: SLA Prioritization
-        if current_stage < 2:
-            await update_stage_progress(ticket_id, 2, "in-progress", "Agent: Calculating SLA...")
-            ticket_context.tickets = [ticket_obj]
-            result = await asyncio.to_thread(orch.sla.invoke, ticket_context)
-            if result.tickets:
-                ticket_obj = result.tickets[0]
-                current_tickets[ticket_id]["slaDeadline"] = ticket_obj.sla_deadline
-                current_tickets[ticket_id]["priority"] = ticket_obj.risk_level.lower()
-                await update_stage_progress(ticket_id, 2, "completed", f"SLA: {ticket_obj.sla_deadline}")
-            current_stage = 2
-            
-        # Stage 3: Ownership Enrichment
-        if current_stage < 3:
-            await update_stage_progress(ticket_id, 3, "in-progress", "Agent: Fetching ownership...")
-            ticket_context.tickets = [ticket_obj]
-            result = await asyncio.to_thread(orch.ownership.invoke, ticket_context)
-            if result.tickets:
-                ticket_obj = result.tickets[0]
-                current_tickets[ticket_id]["lobOwner"] = ticket_obj.lob_owner
-                current_tickets[ticket_id]["applicationName"] = ticket_obj.application_name
-                await update_stage_progress(ticket_id, 3, "completed", f"Owner: {ticket_obj.lob_owner}")
-            current_stage = 3
-            
-        # Stage 4: App Owner Check
-        if current_stage < 4:
-            await update_stage_progress(ticket_id, 4, "in-progress", "Agent: Verifying app owner...")
-            ticket_context.tickets = [ticket_obj]
-            result = await asyncio.to_thread(orch.app_space_checker.invoke, ticket_context)
-            if result.tickets:
-                ticket_obj = result.tickets[0]
-                await update_stage_progress(ticket_id, 4, "completed", "App owner verified")
-            else:
-                await update_stage_progress(ticket_id, 4, "error", "App owner verification failed")
-                return
-            current_stage = 4
-            
-        # Stage 5: Evidence Collection (PAUSE FOR REVIEW)
-        if current_stage < 5:
-            await update_stage_progress(ticket_id, 5, "in-progress", "Agent: Preparing evidence emails...")
-            ticket_context.tickets = [ticket_obj]
-            # Call agent to generate emails but don't send yet (non-blocking)
-            await asyncio.to_thread(orch.evidence.invoke, ticket_context, send=False)
-            
-            # Mark as waiting for review
-            current_tickets[ticket_id]["waitingForReview"] = True
-            await update_stage_progress(ticket_id, 5, "in-progress", "⏸️ Waiting for application team review...")
-            
-            await manager.broadcast({
-                "type": "ticket_update",
-                "ticket": current_tickets[ticket_id]
-            })
-            return # Stop for review
-            
-        # Stage 6: Ticket Closure
-        if current_stage < 6:
-            await update_stage_progress(ticket_id, 6, "in-progress", "Agent: Closing ticket...")
-            ticket_context.tickets = [ticket_obj]
-            result = await asyncio.to_thread(orch.closer.invoke, ticket_context)
-            if result.tickets:
-                ticket_obj = result.tickets[0]
-                await update_stage_progress(ticket_id, 6, "completed", "Ticket closed")
-            current_stage = 6
-            
-        # Stage 7: Logging
-        if current_stage < 7:
-            await update_stage_progress(ticket_id, 7, "in-progress", "Agent: Logging results...")
-            ticket_context.tickets = [ticket_obj]
-            await asyncio.to_thread(orch.logger.invoke, ticket_context)
-            await update_stage_progress(ticket_id, 7, "completed", "Logged successfully")
-            current_tickets[ticket_id]["status"] = "completed"
+        for stage_index in range(current_stage + 1, LAST_STAGE + 1):
+            tickets = await run_stage_for_tickets(stage_index, tickets)
+            if not tickets:
+                return # Error or waiting for review
             
         await manager.broadcast({
             "type": "processing_complete",
-            "message": f"Ticket {ticket_id} processed successfully",
-            "ticket": current_tickets[ticket_id]
+            "message": f"Ticket {ticket_id} processed successfully"
         })
 
     except Exception as e:
@@ -242,22 +365,144 @@ async def process_individual_ticket(ticket_id: str):
             "message": f"Error processing ticket: {str(e)}"
         })
 
+def scheduling_config() -> dict:
+    return get_orchestrator().config.get("scheduling", {})
+
+def record_ticket_duration(seconds: float):
+    """Moving average of how long one ticket takes, for breach prediction"""
+    global ticket_seconds_avg
+    ticket_seconds_avg = seconds if ticket_seconds_avg is None else 0.8 * ticket_seconds_avg + 0.2 * seconds
+
+async def run_queued_ticket(ticket_id: str):
+    start = time.perf_counter()
+    try:
+        await process_individual_ticket(ticket_id)
+    finally:
+        active_ticket_ids.discard(ticket_id)
+    record_ticket_duration(time.perf_counter() - start)
+
+def is_ticket_running(ticket_id: str) -> bool:
+    """True if the per-ticket queue or the batch scheduler already holds the ticket"""
+    return (ticket_id in ticket_queue or ticket_id in active_ticket_ids
+            or get_batch_scheduler().is_scheduled(ticket_id))
+
+def enqueue_ticket(ticket_id: str) -> bool:
+    """Queue a ticket for processing by SLA urgency. Returns False when the queue is full."""
+    if ticket_id not in ticket_queue and not get_stage_executor().has_capacity(len(ticket_queue) + 1):
+        return False
+    ticket = current_tickets[ticket_id]
+    ticket_queue.push(ticket_id, ticket.get("slaDeadline"), ticket.get("priority"))
+    dispatch_queued_tickets()
+    return True
+
+def dispatch_queued_tickets():
+    """Start the most urgent queued tickets while there are free ticket slots"""
+    executor = get_stage_executor()
+    max_active = scheduling_config().get("max_active_tickets", 8)
+    while len(active_ticket_jobs) < max_active and len(ticket_queue) and executor.has_capacity():
+        ticket_id = ticket_queue.pop()
+        active_ticket_ids.add(ticket_id)
+        task = executor.submit(lambda ticket_id=ticket_id: run_queued_ticket(ticket_id))
+        active_ticket_jobs.add(task)
+        task.add_done_callback(on_ticket_job_done)
+
+def on_ticket_job_done(task: asyncio.Task):
+    active_ticket_jobs.discard(task)
+    dispatch_queued_tickets()
+
+def priority_queue_stats() -> dict:
+    max_active = scheduling_config().get("max_active_tickets", 8)
+    seconds_per_ticket = ticket_seconds_avg or scheduling_config().get("seconds_per_ticket_estimate", 30)
+    return {
+        "depth": len(ticket_queue),
+        "head": ticket_queue.peek(),
+        "active": len(active_ticket_jobs),
+        "max_active": max_active,
+        "seconds_per_ticket": round(seconds_per_ticket, 3),
+        "predicted_breaches": ticket_queue.predicted_breaches(seconds_per_ticket, workers=max_active)
+    }
+
+async def process_ticket_batch(stage_index: int, tickets: List[Tuple[str, Ticket]]) -> List[Tuple[str, Ticket]]:
+    """BatchScheduler runner: one stage invocation for a whole micro-batch"""
+    try:
+        advanced = await run_stage_for_tickets(stage_index, tickets)
+    except Exception as e:
+        print(f"Error processing stage {stage_index} batch: {e}")
+        await manager.broadcast({
+            "type": "error",
+            "message": f"Error processing batch: {str(e)}"
+        })
+        return []
+
+    if stage_index == LAST_STAGE:
+        for ticket_id, _ in advanced:
+            await manager.broadcast({
+                "type": "processing_complete",
+                "message": f"Ticket {ticket_id} processed successfully"
+            })
+    return advanced
+
+def get_batch_scheduler() -> BatchScheduler:
+    global batch_scheduler
+    if batch_scheduler is None:
+        batching = get_orchestrator().config.get("batching", {})
+        batch_scheduler = BatchScheduler(
+            process_ticket_batch,
+            first_stage=1,
+            last_stage=LAST_STAGE,
+            max_batch_size=batching.get("max_batch_size", 50),
+            max_wait_ms=batching.get("max_wait_ms", 50)
+        )
+    return batch_scheduler
+
+def add_fetched_tickets(tickets_response: TicketResponse) -> List[dict]:
+    """Register fetched tickets with their first stage marked completed; returns their ticket_added events"""
+    events = []
+    for ticket in tickets_response.tickets:
+        # Keep restored state for tickets we already know about
+        if ticket.ticket_id in current_tickets:
+            continue
+        frontend_ticket = convert_ticket_to_frontend(ticket)
+        # Mark first stage as completed
+        frontend_ticket["stages"][0]["status"] = "completed"
+        frontend_ticket["stages"][0]["message"] = "Ticket fetched successfully"
+        current_tickets[frontend_ticket["id"]] = frontend_ticket
+        events.append(get_event_stream().ticket_added(frontend_ticket))
+    return events
+
+async def broadcast_added_tickets(events: List[dict]):
+    """Send one chunk's new tickets to connected clients as a single message"""
+    if events:
+        await manager.broadcast({"type": "ticket_deltas", "events": events})
+
+async def fetch_ticket_chunks():
+    """Yield fetched tickets as TicketResponse chunks without blocking the event loop"""
+    orch = get_orchestrator()
+    if orch.stage_mode("fetcher") == "direct":
+        # ✅ Stream the ticket file chunk by chunk so large exports show up incrementally
+        chunks = orch.iter_ticket_chunks()
+        while True:
+            chunk = await get_stage_executor().run("fetcher", next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    else:
+        yield await call_stage("fetcher")
+
 async def load_initial_tickets():
     """Load tickets using the TicketFetcherAgent"""
     try:
         print("Fetching initial tickets...")
         orch = get_orchestrator()
+
+        # Warm the shared AppHQ index so the first ownership lookup is a dict hit
+        await asyncio.to_thread(len, get_apphq_repository(orch.ownership.data_file))
         
         # Stage 1: Fetch tickets (non-blocking)
-        tickets_response = await asyncio.to_thread(orch.fetcher.invoke)
-        
-        if tickets_response.tickets:
-            for ticket in tickets_response.tickets:
-                frontend_ticket = convert_ticket_to_frontend(ticket)
-                # Mark first stage as completed
-                frontend_ticket["stages"][0]["status"] = "completed"
-                frontend_ticket["stages"][0]["message"] = "Ticket fetched successfully"
-                current_tickets[frontend_ticket["id"]] = frontend_ticket
+        async for chunk in fetch_ticket_chunks():
+            await broadcast_added_tickets(add_fetched_tickets(chunk))
+
+        if current_tickets:
             print(f"Loaded {len(current_tickets)} tickets")
         else:
             print("No tickets found")
@@ -265,30 +510,318 @@ async def load_initial_tickets():
     except Exception as e:
         print(f"Error loading initial tickets: {e}")
 
+def start_review(ticket_id: str):
+    """Pause a ticket for review; waitingSince is kept on the ticket so it survives a restart"""
+    since = time.time()
+    current_tickets[ticket_id]["waitingForReview"] = True
+    current_tickets[ticket_id]["waitingSince"] = datetime.fromtimestamp(since, timezone.utc).isoformat()
+    review_queue.add(ticket_id, since)
+
+def clear_review(ticket_id: str):
+    """Take a ticket out of review; the stage update that follows persists and publishes it"""
+    current_tickets[ticket_id]["waitingForReview"] = False
+    current_tickets[ticket_id]["waitingSince"] = None
+    review_queue.discard(ticket_id)
+
+def restored_waiting_since(ticket: dict) -> float:
+    """Epoch seconds a restored ticket started waiting; tickets saved without it count from now"""
+    try:
+        return datetime.fromisoformat(ticket["waitingSince"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+def restore_ticket_state() -> int:
+    """Swap in the configured state store and load persisted tickets"""
+    global current_tickets
+    current_tickets = create_ticket_state_store(get_orchestrator().config.get("state_store", {}))
+    ticket_json.clear()
+    restored = current_tickets.load()
+    waiting = []
+    for ticket_id, ticket in current_tickets.items():
+        get_event_stream().track(ticket)
+        if ticket.get("waitingForReview"):
+            waiting.append((restored_waiting_since(ticket), ticket_id))
+    # ✅ Rebuild the review queue oldest first, with the original wait start times
+    for since, ticket_id in sorted(waiting):
+        review_queue.add(ticket_id, since)
+    return restored
+
+def seed_stage_fingerprints():
+    """Record stage inputs for restored tickets so a refresh can tell what changed"""
+    fingerprints = get_orchestrator().fingerprints
+    for ticket in current_tickets.values():
+        ticket_obj = convert_frontend_to_ticket(ticket)
+        for stage in FINGERPRINTED_STAGES:
+            if ticket["stages"][STAGE_INDEX[stage]]["status"] not in ("completed", "error"):
+                break
+            fingerprints.record(stage, [ticket_obj])
+
+async def rerun_from_stage(ticket_id: str, stage_index: int):
+    """Reset a ticket's stages from stage_index on and queue it to run them again"""
+    ticket = current_tickets[ticket_id]
+    clear_review(ticket_id)
+    ticket["status"] = "in-progress"
+    for i in range(LAST_STAGE, stage_index - 1, -1):
+        await update_stage_progress(ticket_id, i, "pending", "Inputs changed, re-running" if i == stage_index else "")
+    # ✅ Rewind to the stage before the rerun, persisted and sent like any other change
+    ticket["currentStage"] = stage_index - 1
+    current_tickets.mark_dirty(ticket_id)
+    ticket_json.invalidate(ticket_id)
+    await manager.broadcast(get_event_stream().ticket_delta(ticket))
+    get_orchestrator().audit_log.record(ticket_id, PIPELINE_STAGES[stage_index]["stage"], "rerun", actor="refresh")
+    get_batch_scheduler().submit(ticket_id, convert_frontend_to_ticket(ticket), stage_index)
+
+async def refresh_tickets() -> dict:
+    """Re-read ticket_data/AppHQ and rerun only the stages whose inputs changed"""
+    fingerprints = get_orchestrator().fingerprints
+    scheduler = get_batch_scheduler()
+    added, rerun, busy = [], {}, []
+    async for chunk in fetch_ticket_chunks():
+        plan = fingerprints.plan(chunk.tickets)
+        new_ids = [t.ticket_id for t in chunk.tickets if t.ticket_id not in current_tickets]
+        added.extend(new_ids)
+        await broadcast_added_tickets(add_fetched_tickets(chunk))
+        for fetched in chunk.tickets:
+            ticket_id = fetched.ticket_id
+            ticket = current_tickets[ticket_id]
+            if ticket_id in new_ids:
+                continue
+            fresh = convert_ticket_to_frontend(fetched)
+            if any(ticket.get(field) != fresh[field] for field in RAW_TICKET_FIELDS):
+                ticket.update({field: fresh[field] for field in RAW_TICKET_FIELDS})
+                current_tickets.mark_dirty(ticket_id)
+                ticket_json.invalidate(ticket_id)
+                ticket_queue.update(ticket_id, ticket["slaDeadline"], ticket["priority"])
+            stage = plan.get(ticket_id)
+            # Tickets that never ran only needed their fields updated
+            if stage is None or ticket["status"] == "not-started":
+                continue
+            if scheduler.is_scheduled(ticket_id) or (ticket["status"] == "in-progress" and not ticket.get("waitingForReview")):
+                busy.append(ticket_id)
+                continue
+            await rerun_from_stage(ticket_id, STAGE_INDEX[stage])
+            rerun[ticket_id] = stage
+    return {"added": added, "rerun": rerun, "busy": busy}
+
+def resume_interrupted_tickets() -> List[str]:
+    """Re-queue restored tickets that were mid-pipeline when the server stopped"""
+    scheduler = get_batch_scheduler()
+    resumed = []
+    for ticket_id, ticket in current_tickets.items():
+        if ticket["status"] != "in-progress" or ticket.get("waitingForReview"):
+            continue
+        # The recorded stage was interrupted unless it completed
+        stage_index = ticket["currentStage"]
+        if ticket["stages"][stage_index]["status"] != "completed":
+            stage_index -= 1
+        if stage_index < LAST_STAGE and scheduler.submit(ticket_id, convert_frontend_to_ticket(ticket), stage_index + 1):
+            resumed.append(ticket_id)
+    return resumed
+
+async def load_and_resume_tickets():
+    """Initial fetch plus resuming interrupted tickets, off the startup path"""
+    start = time.perf_counter()
+    startup_report["initial_load"] = "running"
+    await load_initial_tickets()
+    resumed = resume_interrupted_tickets()
+    if resumed:
+        print(f"Resuming {len(resumed)} interrupted tickets")
+    startup_report["phases"]["initial_load_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    startup_report["initial_load"] = "done"
+
 @app.on_event("startup")
 async def startup_event():
-    await load_initial_tickets()
+    global initial_load_task
+    start = time.perf_counter()
+    restored = restore_ticket_state()
+    if restored:
+        print(f"Restored {restored} tickets from the state store")
+        seed_stage_fingerprints()
+    startup_report["phases"]["restore_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    asyncio.create_task(current_tickets.run_flusher())
+    asyncio.create_task(get_orchestrator().audit_log.run_flusher())
+    # ✅ Serve requests right away; tickets appear as the background load streams them in
+    initial_load_task = asyncio.create_task(load_and_resume_tickets())
+    startup_report["phases"]["ready_ms"] = round((time.perf_counter() - _import_started) * 1000, 3)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if initial_load_task is not None and not initial_load_task.done():
+        initial_load_task.cancel()
+    if stage_executor is not None:
+        stage_executor.shutdown()
+    current_tickets.close()
+    if orchestrator is not None:
+        orchestrator.close()
 
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "Ticket Portal API (Real Agents)"}
 
-@app.get("/api/tickets")
-async def get_tickets():
+@app.get("/api/pipeline/timings")
+async def get_pipeline_timings():
+    return JSONResponse(content=get_orchestrator().latency_report())
+
+@app.get("/api/pipeline/llm-cache")
+async def get_llm_cache_stats():
+    return JSONResponse(content=get_orchestrator().cache_stats())
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics")
+async def get_metrics_summary():
+    return JSONResponse(content=REGISTRY.summary())
+
+@app.get("/api/pipeline/startup")
+async def get_startup_report():
     return JSONResponse(content={
-        "tickets": list(current_tickets.values()),
-        "count": len(current_tickets)
+        **startup_report,
+        "orchestrator": get_orchestrator().startup_report,
+        "langchain_loaded": "langchain" in sys.modules,
+        "langchain_core_loaded": "langchain_core" in sys.modules
     })
 
+@app.get("/api/pipeline/queue")
+async def get_pipeline_queue():
+    stats = get_stage_executor().stats()
+    stats["batch_depths"] = get_batch_scheduler().depths()
+    stats["priority_queue"] = priority_queue_stats()
+    return JSONResponse(content=stats)
+
+# Distinguishes ETags across restarts, when the state version starts over
+STATE_EPOCH = uuid.uuid4().hex[:8]
+TICKET_VIEWS = ("full", "summary")
+
+def encode_cursor(ticket_id: str) -> str:
+    return base64.urlsafe_b64encode(ticket_id.encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def tickets_etag(request: Request) -> str:
+    """Weak ETag from the state version and the query, so unchanged polls get a 304"""
+    query = hashlib.sha1(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:12]
+    return f'W/"{STATE_EPOCH}-{current_tickets.version}-{query}"'
+
+def ticket_matches(ticket: dict, status: Optional[str], priority: Optional[str],
+                   category: Optional[str], stage: Optional[int]) -> bool:
+    return ((status is None or ticket["status"] == status)
+            and (priority is None or ticket["priority"] == priority.lower())
+            and (category is None or (ticket.get("category") or "").upper() == category.upper())
+            and (stage is None or ticket["currentStage"] == stage))
+
+def ticket_summary(ticket: dict) -> dict:
+    """Lightweight projection of a ticket without its stages"""
+    return {k: v for k, v in ticket.items() if k != "stages"}
+
+@app.get("/api/tickets")
+async def get_tickets(request: Request, status: Optional[str] = None, priority: Optional[str] = None,
+                      category: Optional[str] = None, stage: Optional[int] = None,
+                      view: str = "full", cursor: Optional[str] = None, limit: Optional[int] = None):
+    if view not in TICKET_VIEWS:
+        return JSONResponse(status_code=400, content={"error": f"view must be one of {', '.join(TICKET_VIEWS)}"})
+    if limit is not None and limit < 1:
+        return JSONResponse(status_code=400, content={"error": "limit must be at least 1"})
+
+    etag = tickets_etag(request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # Cursor = opaque ID of the last ticket on the previous page
+    after = decode_cursor(cursor) if cursor else None
+    page, total, has_more = [], 0, False
+    started = after is None
+    for ticket_id, ticket in current_tickets.items():
+        if not ticket_matches(ticket, status, priority, category, stage):
+            continue
+        total += 1
+        if not started:
+            started = ticket_id == after
+        elif limit is None or len(page) < limit:
+            page.append((ticket_id, ticket))
+        else:
+            has_more = True
+
+    # ✅ Unchanged tickets reuse their cached encoding; only the envelope is encoded per request
+    encoded = ticket_json.encode_many(page, view, ticket_summary if view == "summary" else None)
+    return EncodedJSONResponse(join_object("tickets", encoded, {
+        "count": len(page),
+        "total": total,
+        "next_cursor": encode_cursor(page[-1][0]) if has_more else None
+    }), headers=headers)
+
 @app.get("/api/tickets/{ticket_id}")
 async def get_ticket(ticket_id: str):
     if ticket_id in current_tickets:
-        return JSONResponse(content=current_tickets[ticket_id])
+        return EncodedJSONResponse(ticket_json.encode(ticket_id, current_tickets[ticket_id]))
     return JSONResponse(status_code=404, content={"error": "Ticket not found"})
 
+@app.get("/api/tickets/{ticket_id}/audit")
+async def get_ticket_audit(ticket_id: str, limit: Optional[int] = None):
+    """A ticket's audit history from the per-ticket index (oldest first)"""
+    if limit is not None and limit < 1:
+        return JSONResponse(status_code=400, content={"error": "limit must be at least 1"})
+    records = await asyncio.to_thread(get_orchestrator().audit_log.history, ticket_id, limit)
+    if not records and ticket_id not in current_tickets:
+        return JSONResponse(status_code=404, content={"error": "Ticket not found"})
+    return FastJSONResponse(content={"ticket_id": ticket_id, "count": len(records), "records": records})
+
+@app.post("/api/tickets/process-batch")
+async def process_ticket_batch_endpoint(request: Optional[BatchProcessRequest] = None):
+    """Queue tickets for micro-batched processing (all pending tickets if no IDs given)"""
+    ticket_ids = request.ticket_ids if request and request.ticket_ids is not None else list(current_tickets)
+    scheduler = get_batch_scheduler()
+    if scheduler.pending() + len(ticket_ids) > get_stage_executor().max_queue:
+        return queue_full_response(f"Batch queue is full ({scheduler.pending()} tickets pending)")
+
+    queued, skipped = [], []
+    for ticket_id in ticket_ids:
+        ticket = current_tickets.get(ticket_id)
+        # ✅ Only tickets that haven't started: an in-progress ticket is already running, waiting
+        # for review, or was stopped by a stage (e.g. a failed owner check) and must not skip past it
+        if (ticket is None or ticket["status"] != "not-started" or is_ticket_running(ticket_id)
+                or not scheduler.submit(ticket_id, convert_frontend_to_ticket(ticket), ticket["currentStage"] + 1)):
+            skipped.append(ticket_id)
+        else:
+            queued.append(ticket_id)
+
+    audit_log = get_orchestrator().audit_log
+    for ticket_id in queued:
+        audit_log.record(ticket_id, "queue", "queued", actor="api", batched=True)
+    if queued:
+        await manager.broadcast({
+            "type": "processing_start",
+            "message": f"Processing {len(queued)} tickets in batches..."
+        })
+    return JSONResponse(content={"status": "success", "queued": queued, "skipped": skipped})
+
+@app.post("/api/tickets/refresh")
+async def refresh_tickets_endpoint():
+    """Pick up changes to ticket_data.json / apphq_data.json without a restart"""
+    result = await refresh_tickets()
+    if result["rerun"]:
+        await manager.broadcast({
+            "type": "processing_start",
+            "message": f"Re-running changed stages for {len(result['rerun'])} tickets..."
+        })
+    return JSONResponse(content={"status": "success", **result})
+
 @app.post("/api/tickets/{ticket_id}/process")
 async def process_single_ticket(ticket_id: str):
-    asyncio.create_task(process_individual_ticket(ticket_id))
+    if ticket_id not in current_tickets:
+        return JSONResponse(status_code=404, content={"error": "Ticket not found"})
+    if ticket_id in active_ticket_ids or get_batch_scheduler().is_scheduled(ticket_id):
+        return JSONResponse(status_code=409, content={"error": "Ticket is already being processed"})
+    if not enqueue_ticket(ticket_id):
+        return queue_full_response(f"Ticket queue is full ({get_stage_executor().max_queue} pending jobs)")
+    get_orchestrator().audit_log.record(ticket_id, "queue", "queued", actor="api")
     return JSONResponse(content={"status": "success", "message": "Processing started"})
 
 @app.post("/api/tickets/{ticket_id}/approve-review")
@@ -299,27 +832,100 @@ async def approve_review(ticket_id: str):
     ticket = current_tickets[ticket_id]
     if not ticket.get("waitingForReview", False):
         return JSONResponse(status_code=400, content={"error": "Not waiting for review"})
+
+    if not get_stage_executor().has_capacity(len(ticket_queue) + 1):
+        return queue_full_response(f"Ticket queue is full ({get_stage_executor().max_queue} pending jobs)")
     
-    current_tickets[ticket_id]["waitingForReview"] = False
+    clear_review(ticket_id)
+    get_orchestrator().audit_log.record(ticket_id, "evidence", "approved", actor="reviewer")
     await update_stage_progress(ticket_id, 5, "completed", "Review approved")
     current_tickets[ticket_id]["currentStage"] = 5
     
-    asyncio.create_task(process_individual_ticket(ticket_id))
+    enqueue_ticket(ticket_id)
     
     return JSONResponse(content={"status": "success", "message": "Review approved"})
 
+@app.get("/api/reviews")
+async def get_reviews(priority: Optional[str] = None, category: Optional[str] = None, owner: Optional[str] = None,
+                      order: str = "waiting", cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Tickets waiting for review, oldest first (or most urgent SLA first with order=sla)"""
+    if order not in REVIEW_ORDERS:
+        return JSONResponse(status_code=400, content={"error": f"order must be one of {', '.join(REVIEW_ORDERS)}"})
+    if limit is not None and limit < 1:
+        return JSONResponse(status_code=400, content={"error": "limit must be at least 1"})
+
+    after = decode_cursor(cursor) if cursor else None
+    page, total, has_more = [], 0, False
+    started = after is None
+    for ticket_id in review_queue.ordered(current_tickets, order):
+        ticket = current_tickets[ticket_id]
+        if not ticket_matches(ticket, None, priority, category, None):
+            continue
+        if owner is not None and ticket.get("applicationOwner") != owner:
+            continue
+        total += 1
+        if not started:
+            started = ticket_id == after
+        elif limit is None or len(page) < limit:
+            page.append(ticket_summary(ticket))
+        else:
+            has_more = True
+
+    return FastJSONResponse(content={
+        "reviews": page,
+        "count": len(page),
+        "total": total,
+        "next_cursor": encode_cursor(page[-1]["id"]) if has_more else None
+    })
+
+@app.post("/api/reviews/approve")
+async def approve_reviews(request: ReviewApprovalRequest):
+    """Approve many reviews at once and resume them through the batch scheduler"""
+    ticket_ids = list(dict.fromkeys(request.ticket_ids))
+    scheduler = get_batch_scheduler()
+    if scheduler.pending() + len(ticket_ids) > get_stage_executor().max_queue:
+        return queue_full_response(f"Batch queue is full ({scheduler.pending()} tickets pending)")
+
+    audit_log = get_orchestrator().audit_log
+    approved, skipped, events = [], [], []
+    for ticket_id in ticket_ids:
+        ticket = current_tickets.get(ticket_id)
+        if ticket is None or not ticket.get("waitingForReview") or scheduler.is_scheduled(ticket_id):
+            skipped.append(ticket_id)
+            continue
+        clear_review(ticket_id)
+        audit_log.record(ticket_id, PIPELINE_STAGES[REVIEW_STAGE]["stage"], "approved", actor="reviewer", bulk=True)
+        events.append(apply_stage_progress(ticket_id, REVIEW_STAGE, "completed", "Review approved"))
+        scheduler.submit(ticket_id, convert_frontend_to_ticket(ticket), REVIEW_STAGE + 1)
+        approved.append(ticket_id)
+
+    if events:
+        # ✅ One coalesced message for the whole approval instead of one broadcast per ticket
+        await manager.broadcast({
+            "type": "ticket_deltas",
+            "events": events,
+            "message": f"Approved {len(approved)} reviews, resuming in batches..."
+        })
+    return JSONResponse(content={"status": "success", "approved": approved, "skipped": skipped})
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, since: Optional[int] = None):
     await manager.connect(websocket)
     try:
-        await websocket.send_json({
-            "type": "initial_state",
-            "tickets": list(current_tickets.values())
-        })
+        stream = get_event_stream()
+        missed = stream.since(since) if since is not None else None
+        if missed is not None:
+            # ✅ Reconnect: replay only the events after the client's last seq
+            await manager.send(websocket, {"type": "replay", "events": missed, "seq": stream.seq})
+        else:
+            tickets = ticket_json.encode_many(current_tickets.items())
+            await manager.send_encoded(websocket, join_object(
+                "tickets", tickets, {"type": "initial_state", "seq": stream.seq}
+            ).decode("utf-8"))
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send(websocket, {"type": "pong"})
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
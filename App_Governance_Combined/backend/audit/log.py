@@ -0,0 +1,250 @@
+# audit/log.py
+import asyncio
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+def audit_record(ticket_id: Optional[str], stage: str, outcome: str, latency_ms: float = None,
+                 actor: str = "pipeline", message: str = None, **details) -> dict:
+    """One structured audit entry; extra keyword arguments go under "details"."""
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "ticket_id": ticket_id,
+        "stage": stage,
+        "outcome": outcome,
+        "latency_ms": round(latency_ms, 3) if latency_ms is not None else None,
+        "actor": actor,
+    }
+    if message:
+        record["message"] = message
+    if details:
+        record["details"] = details
+    return record
+
+class AuditLog:
+    """Append-only JSONL audit log with buffered writes and a per-ticket index.
+
+    ``record`` only appends to an in-memory buffer; a background flusher
+    writes the buffer every ``flush_interval_ms`` (or as soon as it holds
+    ``max_buffer`` records) in one write off the event loop. Files are
+    segments ``audit-000001.jsonl``, ``audit-000002.jsonl``, ...; a new
+    segment starts once the current one reaches ``max_bytes`` and only the
+    newest ``backup_count + 1`` segments are kept. The index maps each
+    ticket to the (segment, offset, length) of its lines, so a ticket's
+    history is read with a few seeks instead of scanning the files.
+    """
+
+    SEGMENT_PATTERN = re.compile(r"audit-(\d+)\.jsonl$")
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 flush_interval_ms: float = 200, max_buffer: int = 1000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffer = max_buffer
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buffer: List[dict] = []
+        # ticket_id -> [(segment, offset, length)] for written lines
+        self._index: Dict[str, List[Tuple[int, int, int]]] = {}
+        self._segment = 1
+        self._segment_size = 0
+        self._loop = None
+        self._wake = None
+        self.written = 0
+        self._load()
+        atexit.register(self.flush)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"audit-{segment:06d}.jsonl")
+
+    def _segments(self) -> List[int]:
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, "audit-*.jsonl")):
+            match = self.SEGMENT_PATTERN.search(path)
+            if match:
+                segments.append(int(match.group(1)))
+        return sorted(segments)
+
+    def _load(self):
+        # One pass over the kept segments at startup rebuilds the index
+        segments = self._segments()
+        for segment in segments:
+            offset = 0
+            with open(self._segment_path(segment), "rb") as f:
+                for line in f:
+                    try:
+                        ticket_id = json.loads(line).get("ticket_id")
+                    except ValueError:
+                        ticket_id = None  # torn write from a crash
+                    if ticket_id:
+                        self._index.setdefault(ticket_id, []).append((segment, offset, len(line)))
+                    offset += len(line)
+        if segments:
+            self._segment = segments[-1]
+            self._segment_size = os.path.getsize(self._segment_path(self._segment))
+
+    def record(self, ticket_id: Optional[str], stage: str, outcome: str, latency_ms: float = None,
+               actor: str = "pipeline", message: str = None, **details):
+        self.write(audit_record(ticket_id, stage, outcome, latency_ms, actor, message, **details))
+
+    def write(self, *records: dict):
+        """Buffer records; never blocks on disk."""
+        with self._lock:
+            self._buffer.extend(records)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            if self._loop is None:
+                self.flush()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+
+    def flush(self):
+        """Write every buffered record to the current segment."""
+        with self._write_lock:
+            with self._lock:
+                records = self._buffer[:]
+            if not records:
+                return
+            written = []
+            # The directory can be gone (e.g. a removed temp dir); start it over
+            os.makedirs(self.directory, exist_ok=True)
+            f = open(self._segment_path(self._segment), "ab")
+            try:
+                for record in records:
+                    line = (json.dumps(record, default=str) + "\n").encode()
+                    if self._segment_size and self._segment_size + len(line) > self.max_bytes:
+                        f.close()
+                        f = self._rotate()
+                    f.write(line)
+                    if record.get("ticket_id"):
+                        written.append((record["ticket_id"], (self._segment, self._segment_size, len(line))))
+                    self._segment_size += len(line)
+            finally:
+                f.close()
+            # Records move from the buffer to the index only once they are on disk
+            oldest_kept = self._segment - self.backup_count
+            with self._lock:
+                del self._buffer[:len(records)]
+                for ticket_id, entry in written:
+                    if entry[0] >= oldest_kept:
+                        self._index.setdefault(ticket_id, []).append(entry)
+            self.written += len(records)
+
+    def _rotate(self):
+        self._segment += 1
+        self._segment_size = 0
+        oldest_kept = self._segment - self.backup_count
+        for segment in self._segments():
+            if segment < oldest_kept:
+                os.remove(self._segment_path(segment))
+        with self._lock:
+            for ticket_id in list(self._index):
+                kept = [entry for entry in self._index[ticket_id] if entry[0] >= oldest_kept]
+                if kept:
+                    self._index[ticket_id] = kept
+                else:
+                    del self._index[ticket_id]
+        return open(self._segment_path(self._segment), "ab")
+
+    async def run_flusher(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"Error flushing audit log: {e}")
+        finally:
+            self._loop = None
+
+    def history(self, ticket_id: str, limit: int = None) -> List[dict]:
+        """A ticket's audit records, oldest first, including ones not yet flushed."""
+        with self._lock:
+            entries = list(self._index.get(ticket_id, []))
+            pending = [r for r in self._buffer if r.get("ticket_id") == ticket_id]
+        if limit is not None:
+            pending = pending[-limit:]
+            entries = entries[-(limit - len(pending)):] if limit > len(pending) else []
+
+        records, handles = [], {}
+        try:
+            for segment, offset, length in entries:
+                f = handles.get(segment)
+                if f is None:
+                    try:
+                        f = handles[segment] = open(self._segment_path(segment), "rb")
+                    except FileNotFoundError:
+                        continue  # rotated away after the index was read
+                f.seek(offset)
+                records.append(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return records + pending
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "segment": self._segment,
+                "segment_bytes": self._segment_size,
+                "buffered": len(self._buffer),
+                "written": self.written,
+                "tickets_indexed": len(self._index),
+            }
+
+    def close(self):
+        """Flush what is buffered and stop flushing at interpreter exit."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+class NullAuditLog:
+    """Audit log used when auditing is disabled."""
+
+    def record(self, *args, **kwargs):
+        pass
+
+    def write(self, *records: dict):
+        pass
+
+    def flush(self):
+        pass
+
+    async def run_flusher(self):
+        pass
+
+    def history(self, ticket_id: str, limit: int = None) -> List[dict]:
+        return []
+
+    def stats(self) -> dict:
+        return {"directory": None}
+
+    def close(self):
+        pass
+
+def create_audit_log(config: dict):
+    """Build the audit log described by the "audit" config section."""
+    if not config.get("enabled", True):
+        return NullAuditLog()
+    return AuditLog(
+        config.get("directory", "state/audit"),
+        max_bytes=config.get("max_bytes", 10 * 1024 * 1024),
+        backup_count=config.get("backup_count", 5),
+        flush_interval_ms=config.get("flush_interval_ms", 200),
+        max_buffer=config.get("max_buffer", 1000)
+    )
@@ -0,0 +1,40 @@
+# benchmarks/fake_llm.py
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+class DeterministicChatModel(BaseChatModel):
+    """Stand-in for ChatOpenAI: one tool call, then a fixed final answer.
+
+    Token usage is derived from message lengths so LLM metrics and the
+    agent loop overhead can be measured without network calls.
+    """
+
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "deterministic-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tool_names": [tool.name for tool in tools]})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if isinstance(messages[-1], ToolMessage) or not self.tool_names:
+            message = AIMessage(content="Done.")
+        else:
+            # Tools read the live ticket batch themselves (agents.tool_output)
+            message = AIMessage(content="", tool_calls=[
+                {"name": self.tool_names[0], "args": {"__arg1": "tickets"}, "id": "call_0"}
+            ])
+
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion_tokens = len(str(message.content)) // 4 + 1
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,78 @@
+# benchmarks/harness.py
+import copy
+import os
+import statistics
+import time
+from functools import cached_property
+from typing import Callable
+
+from orchestrator import IAMOrchestrator, PIPELINE_STAGES
+from config.loader import get_config
+from benchmarks.fake_llm import DeterministicChatModel
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(BACKEND_DIR, "config", "config.json")
+
+def benchmark_config(data_dir: str, mode: str = "direct", llm_cache: dict = None) -> dict:
+    """config.json with in-memory state, the given LLM cache and audit logs under data_dir."""
+    # Private copy: the parsed config.json is shared with the rest of the process
+    config = copy.deepcopy(get_config(CONFIG_FILE))
+    config["state_store"] = {"backend": "memory"}
+    config["llm_cache"] = llm_cache or {"backend": "none"}
+    config["audit"] = {**config.get("audit", {}), "directory": os.path.join(data_dir, "audit")}
+    config["execution"] = {**config.get("execution", {}), "default_mode": mode,
+                           "stages": {stage: mode for stage in PIPELINE_STAGES}}
+    return config
+
+class BenchmarkOrchestrator(IAMOrchestrator):
+    """IAMOrchestrator over synthetic data with the deterministic chat model.
+
+    Call ``close()`` when done so the audit log is flushed while its
+    directory still exists.
+    """
+
+    def __init__(self, ticket_file: str, apphq_file: str, mode: str = "direct", llm_cache: dict = None):
+        super().__init__("benchmark", config=benchmark_config(os.path.dirname(ticket_file), mode, llm_cache))
+        self.fetcher.data_file = ticket_file
+        self.fetcher.data_format = None
+        self.ownership.data_file = apphq_file
+
+    @cached_property
+    def llm(self):
+        from metrics.llm_callbacks import LLMMetricsHandler
+        return DeterministicChatModel(cache=self.llm_cache, callbacks=[LLMMetricsHandler("deterministic-fake")])
+
+def summarize(samples_ms: list) -> dict:
+    """min / mean / p50 / p95 / max of a list of millisecond samples."""
+    if not samples_ms:
+        return {"samples": 0}
+    ordered = sorted(samples_ms)
+    p95_index = min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))
+    return {
+        "samples": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[p95_index], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+def time_calls(func: Callable, repeat: int, setup: Callable = None) -> dict:
+    """Time ``func(setup())`` repeat times; setup (e.g. copying inputs) is not timed.
+
+    Failed calls are timed too and counted under ``errors`` with the last message.
+    """
+    samples, errors, last_error = [], 0, None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            errors += 1
+            last_error = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        samples.append((time.perf_counter() - start) * 1000)
+    summary = summarize(samples)
+    if errors:
+        summary.update({"errors": errors, "last_error": last_error})
+    return summary
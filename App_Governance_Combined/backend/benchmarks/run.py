@@ -0,0 +1,437 @@
+# benchmarks/run.py
+"""Benchmark the tool functions, IAMOrchestrator.run and the API on synthetic data.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --tickets 5000 --aits 200 --out benchmarks/results/latest.json
+    python -m benchmarks.run --baseline benchmarks/results/previous.json
+
+Agent mode uses DeterministicChatModel instead of ChatOpenAI, so no API key
+or network access is needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing
+from datetime import datetime, timezone
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from schemas.ticket_context import Ticket, TicketResponse
+from agents.tool_output import tool_artifact
+from agents.category_checker import filter_iam_tickets
+from agents.app_owner_check import check_owner_space
+from pipeline.ticket_batch import TicketBatch, check_owner_space_batch, filter_iam_batch
+from metrics.registry import REGISTRY
+from benchmarks.harness import BACKEND_DIR, BenchmarkOrchestrator, summarize, time_calls
+from benchmarks.synthetic_data import (
+    ALLOWED_SPACES, add_dataset_arguments, dataset_kwargs, generate_apphq, generate_tickets, write_dataset
+)
+
+# Read-only endpoints hit concurrently; {id} is replaced with a random ticket ID
+API_ENDPOINTS = [
+    "/api/tickets?limit=50&view=summary",
+    "/api/tickets/{id}",
+    "/api/pipeline/queue",
+    "/api/reviews?limit=50",
+    "/metrics",
+]
+
+def copy_tickets(tickets: TicketResponse) -> TicketResponse:
+    # Tool functions update tickets in place, so every timed call gets fresh copies
+    return tickets.model_copy(deep=True)
+
+def stage_inputs(orch: BenchmarkOrchestrator) -> dict:
+    """Each tool's input, produced by running the chain once in direct mode."""
+    fetched = orch.fetcher.run_tool()
+    categorized = orch.categorizer.run_tool(copy_tickets(fetched))
+    prioritized = orch.sla.run_tool(copy_tickets(categorized))
+    enriched = orch.ownership.run_tool(copy_tickets(prioritized))
+    checked = orch.app_space_checker.run_tool(copy_tickets(enriched))
+    return {
+        "categorizer": fetched,
+        "sla": categorized,
+        "ownership": prioritized,
+        "app_space_checker": enriched,
+        "evidence": checked,
+        "closer": checked,
+        "logger": checked,
+    }
+
+def bench_tools(ticket_file: str, apphq_file: str, repeat: int, agent_repeat: int) -> dict:
+    """Each stage's tool function in direct mode and its agent loop with the fake model."""
+    with closing(BenchmarkOrchestrator(ticket_file, apphq_file)) as orch:
+        inputs = stage_inputs(orch)
+        results = {"direct": {}, "agent": {}, "tickets_in": {stage: len(t.tickets) for stage, t in inputs.items()}}
+
+        results["direct"]["fetcher"] = time_calls(orch.fetcher.run_tool, repeat)
+        for stage, tickets in inputs.items():
+            tool = orch.agent(stage).run_tool
+            results["direct"][stage] = time_calls(tool, repeat, setup=lambda t=tickets: (copy_tickets(t),))
+
+    with closing(BenchmarkOrchestrator(ticket_file, apphq_file, mode="agent")) as agent_orch:
+        for stage, tickets in {"fetcher": None, **inputs}.items():
+            if stage == "evidence":
+                continue  # never goes through the LLM
+            agent = agent_orch.agent(stage, with_llm=True)
+            setup = (lambda t=tickets: (copy_tickets(t),)) if tickets is not None else None
+            results["agent"][stage] = time_calls(agent.invoke, agent_repeat, setup=setup)
+    return results
+
+def bench_orchestrator(ticket_file: str, apphq_file: str, repeat: int, agent_repeat: int) -> dict:
+    """Full IAMOrchestrator.run, sync and async, in direct and agent mode."""
+    results = {}
+    for mode, runs in (("direct", repeat), ("agent", agent_repeat)):
+        with closing(BenchmarkOrchestrator(ticket_file, apphq_file, mode=mode)) as orch:
+            results[mode] = {
+                "run": time_calls(orch.run, runs),
+                "arun": time_calls(lambda: asyncio.run(orch.arun()), runs),
+                "stages": orch.latency_report(),
+            }
+            try:
+                result = orch.run()
+            except Exception as e:
+                print(f"Error in {mode} mode run: {e}")
+                continue
+        results[mode].update({
+            "tickets_out": len(result["tickets"].tickets) if result["tickets"] else 0,
+            "emails": len(result["emails"]["emails"]) if result["emails"] else 0,
+            "dag": {k: result["dag"][k] for k in ("wall_ms", "stage_ms_total", "critical_path")}
+            if result.get("dag") else None,
+        })
+    return results
+
+def check_llm_cache(ticket_file: str, apphq_file: str) -> dict:
+    """Agent-mode run twice over one in-memory LLM cache; the repeat run should only hit."""
+    with closing(BenchmarkOrchestrator(ticket_file, apphq_file, mode="agent",
+                                       llm_cache={"backend": "memory"})) as orch:
+        orch.run()
+        first = orch.cache_stats()
+        orch.run()
+        repeat = orch.cache_stats()
+    return {
+        "first_misses": first["misses"],
+        "repeat_hits": repeat["hits"] - first["hits"],
+        "repeat_misses": repeat["misses"] - first["misses"],
+    }
+
+def bench_handoff(size: int, repeat: int) -> dict:
+    """Cost of handing a batch of size tickets from one agent stage to the next.
+
+    ``json_roundtrip`` is what a stage paid when the tool output went through
+    ToolMessage content and was parsed back with TicketResponse.parse_raw;
+    ``revalidate`` is rebuilding TicketResponse(tickets=...) around tickets
+    that were already valid; ``artifact`` is the live ToolMessage.artifact
+    hand-off used now.
+    """
+    batch = TicketResponse(tickets=[Ticket(**r) for r in generate_tickets(size, 100, {"IAM": 1.0})])
+    results = {
+        "tickets": size,
+        "json_roundtrip": time_calls(lambda: TicketResponse.model_validate_json(batch.model_dump_json()), repeat),
+        "revalidate": time_calls(lambda: TicketResponse(tickets=batch.tickets), repeat),
+        "artifact": time_calls(lambda: TicketResponse.of(tool_artifact(batch)[1].tickets), repeat),
+    }
+    # One hand-off per agent stage that returns tickets (fetcher .. closer)
+    handoffs = 6
+    before = results["json_roundtrip"]["p50_ms"] + results["revalidate"]["p50_ms"]
+    results["saved_ms_per_run"] = round((before - results["artifact"]["p50_ms"]) * handoffs, 3)
+    return results
+
+def _allocated(build):
+    """(result, bytes still allocated after build())."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+def bench_columnar(size: int, aits: int, repeat: int) -> dict:
+    """TicketResponse vs TicketBatch for size enriched tickets: memory and the two filter stages."""
+    owners = {r["ait_number"]: r for r in generate_apphq(aits)}
+    records = []
+    for r in generate_tickets(size, aits):
+        details = owners.get(r["ait_number"], {})
+        records.append({**r, **{k: details.get(k) for k in
+                                ("application_name", "application_owner", "lob_owner", "ait_owner")},
+                        "contacts": details.get("contacts", [])})
+
+    objects, object_bytes = _allocated(lambda: TicketResponse(tickets=[Ticket(**r) for r in records]))
+    batch, batch_bytes = _allocated(lambda: TicketBatch.from_records(records))
+    iam_objects, iam_batch = filter_iam_tickets(objects), filter_iam_batch(batch)
+    return {
+        "tickets": size,
+        "memory": {"ticket_response_bytes": object_bytes, "ticket_batch_bytes": batch_bytes,
+                   "ratio": round(batch_bytes / object_bytes, 3) if object_bytes else None},
+        "filter_iam": {
+            "ticket_response": time_calls(lambda: filter_iam_tickets(objects), repeat),
+            "ticket_batch": time_calls(lambda: filter_iam_batch(batch), repeat),
+        },
+        "owner_space": {
+            "ticket_response": time_calls(lambda: check_owner_space(iam_objects, ALLOWED_SPACES), repeat),
+            "ticket_batch": time_calls(lambda: check_owner_space_batch(iam_batch, ALLOWED_SPACES), repeat),
+        },
+        "to_response": time_calls(lambda: iam_batch.to_response(), repeat),
+    }
+
+def bench_serialization(size: int, repeat: int) -> dict:
+    """Encoding a size-ticket GET /api/tickets body and WebSocket snapshot: stdlib vs dumps() vs the cache."""
+    from fastapi.responses import JSONResponse
+    from api_server import convert_ticket_to_frontend
+    from realtime.json_codec import FastJSONResponse, TicketJSONCache, dumps_text, encoder_name, join_object
+
+    tickets = {r["ticket_id"]: convert_ticket_to_frontend(Ticket(**r)) for r in generate_tickets(size, 100)}
+    envelope = {"count": size, "total": size, "next_cursor": None}
+    cache = TicketJSONCache()
+    cache.encode_many(tickets.items())
+    # One ticket changes between polls, as after a stage update
+    changed = next(iter(tickets))
+
+    def cached_body():
+        cache.invalidate(changed)
+        return join_object("tickets", cache.encode_many(tickets.items()), envelope)
+
+    snapshot = {"type": "initial_state", "tickets": list(tickets.values()), "seq": 0}
+    return {
+        "tickets": size,
+        "encoder": encoder_name(),
+        "response": {
+            "json_response": time_calls(lambda: JSONResponse(content={"tickets": list(tickets.values()), **envelope}), repeat),
+            "fast_json_response": time_calls(
+                lambda: FastJSONResponse(content={"tickets": list(tickets.values()), **envelope}), repeat),
+            "cached": time_calls(cached_body, repeat),
+        },
+        "websocket_snapshot": {
+            "json_dumps": time_calls(lambda: json.dumps(snapshot), repeat),
+            "dumps_text": time_calls(lambda: dumps_text(snapshot), repeat),
+            "cached": time_calls(lambda: join_object(
+                "tickets", cache.encode_many(tickets.items()), {"type": "initial_state", "seq": 0}
+            ).decode("utf-8"), repeat),
+        },
+        "body_bytes": len(cached_body()),
+    }
+
+async def _load(client, paths: list, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, statuses = [], {}
+
+    async def one(path: str):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(paths[i % len(paths)]) for i in range(requests)))
+    wall = time.perf_counter() - start
+    return {**summarize(samples), "requests_per_s": round(requests / wall, 1),
+            "status": {str(code): count for code, count in statuses.items()}}
+
+async def _process_all(client, api_server, ticket_ids: list, timeout: float) -> dict:
+    """POST /api/tickets/process-batch in queue-sized slices and wait until every ticket settles."""
+    max_queue = api_server.get_stage_executor().max_queue
+    scheduler = api_server.get_batch_scheduler()
+    rejected = 0
+    start = time.perf_counter()
+    for i in range(0, len(ticket_ids), max_queue):
+        batch = ticket_ids[i:i + max_queue]
+        while True:
+            response = await client.post("/api/tickets/process-batch", json={"ticket_ids": batch})
+            if response.status_code != 429:
+                break
+            rejected += 1
+            await asyncio.sleep(0.01)
+    while scheduler.pending() and time.perf_counter() - start < timeout:
+        await asyncio.sleep(0.005)
+    wall = time.perf_counter() - start
+    return {"tickets": len(ticket_ids), "wall_ms": round(wall * 1000, 3),
+            "tickets_per_s": round(len(ticket_ids) / wall, 1), "rejected_429": rejected,
+            "timed_out": bool(scheduler.pending()), "final_status": _final_status(api_server, ticket_ids)}
+
+def _final_status(api_server, ticket_ids: list) -> dict:
+    statuses = {}
+    for ticket_id in ticket_ids:
+        ticket = api_server.current_tickets[ticket_id]
+        if ticket.get("waitingForReview"):
+            status = "review"
+        elif any(stage["status"] == "error" for stage in ticket["stages"]):
+            status = "error"
+        else:
+            status = ticket["status"]
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+async def _approve_reviews(client, api_server, ticket_ids: list, timeout: float) -> dict:
+    """Page through GET /api/reviews, bulk-approve each page and wait for the tickets to finish."""
+    scheduler = api_server.get_batch_scheduler()
+    page_size = api_server.get_stage_executor().max_queue
+    approved, requests = 0, 0
+    start = time.perf_counter()
+    while True:
+        reviews = (await client.get(f"/api/reviews?limit={page_size}")).json()["reviews"]
+        if not reviews:
+            break
+        while True:
+            response = await client.post("/api/reviews/approve", json={"ticket_ids": [r["id"] for r in reviews]})
+            requests += 1
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(0.01)
+        approved += len(response.json()["approved"])
+    while scheduler.pending() and time.perf_counter() - start < timeout:
+        await asyncio.sleep(0.005)
+    wall = time.perf_counter() - start
+    return {"approved": approved, "approve_requests": requests, "wall_ms": round(wall * 1000, 3),
+            "timed_out": bool(scheduler.pending()), "final_status": _final_status(api_server, ticket_ids)}
+
+async def bench_api(ticket_file: str, apphq_file: str, requests: int, concurrency: int,
+                    mode: str = "direct", timeout: float = 300) -> dict:
+    """Read endpoints under concurrent load, then batch processing through the API."""
+    import httpx
+    import api_server
+
+    api_server.orchestrator = BenchmarkOrchestrator(ticket_file, apphq_file, mode=mode)
+    await api_server.startup_event()
+    try:
+        await api_server.initial_load_task
+        ticket_ids = list(api_server.current_tickets)
+        rng = random.Random(0)
+        endpoint_paths = {
+            template: [template.replace("{id}", rng.choice(ticket_ids)) for _ in range(50)]
+            if "{id}" in template and ticket_ids else [template]
+            for template in API_ENDPOINTS
+        }
+
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            results = {"tickets_loaded": len(ticket_ids), "startup": api_server.startup_report["phases"],
+                       "endpoints": {}}
+            for template, paths in endpoint_paths.items():
+                results["endpoints"][template] = await _load(client, paths, requests, concurrency)
+            mixed = [path for paths in endpoint_paths.values() for path in paths]
+            results["mixed"] = await _load(client, mixed, requests, concurrency)
+            results["process_batch"] = await _process_all(client, api_server, ticket_ids, timeout)
+            results["approve_reviews"] = await _approve_reviews(client, api_server, ticket_ids, timeout)
+        results["ticket_stage_latency"] = REGISTRY.summary().get("iam_ticket_stage_latency_seconds", {})
+        return results
+    finally:
+        await api_server.shutdown_event()
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"tools": {"direct": {"sla": {"p50_ms": 1}}}} -> {"tools.direct.sla.p50_ms": 1}"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Latency metrics (p50/p95/wall) that got slower than the baseline by more than threshold."""
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    for path, value in now.items():
+        if not path.endswith(("p50_ms", "p95_ms", "wall_ms")) or path.startswith("meta."):
+            continue
+        old = before.get(path)
+        if old and value > old * (1 + threshold):
+            regressions.append({"metric": path, "baseline": old, "current": value,
+                                "change": f"+{(value / old - 1) * 100:.1f}%"})
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the IAM pipeline on synthetic data")
+    add_dataset_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per direct-mode measurement")
+    parser.add_argument("--agent-repeat", type=int, default=2, help="timed runs per agent-mode measurement")
+    parser.add_argument("--requests", type=int, default=500, help="requests per API endpoint")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent API requests")
+    parser.add_argument("--suites", default="tools,orchestrator,api,handoff,columnar,serialization",
+                        help="comma-separated suites to run")
+    parser.add_argument("--handoff-size", type=int, default=10000,
+                        help="tickets per batch in the handoff, columnar and serialization suites")
+    parser.add_argument("--data-dir", help="write the synthetic dataset here instead of a temp dir")
+    parser.add_argument("--out", help="results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    suites = {s.strip() for s in args.suites.split(",") if s.strip()}
+
+    with tempfile.TemporaryDirectory(prefix="iam-bench-") as tmp:
+        data_dir = args.data_dir or tmp
+        start = time.perf_counter()
+        ticket_file, apphq_file = write_dataset(data_dir, **dataset_kwargs(args))
+        results = {"meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+            "generate_ms": round((time.perf_counter() - start) * 1000, 3),
+        }}
+
+        if "tools" in suites:
+            print("Timing tool functions...")
+            results["tools"] = bench_tools(ticket_file, apphq_file, args.repeat, args.agent_repeat)
+        if "orchestrator" in suites:
+            print("Timing IAMOrchestrator.run...")
+            results["orchestrator"] = bench_orchestrator(ticket_file, apphq_file, args.repeat, args.agent_repeat)
+            results["orchestrator"]["llm_cache"] = check_llm_cache(ticket_file, apphq_file)
+        if "handoff" in suites:
+            print(f"Timing stage hand-offs for {args.handoff_size} tickets...")
+            results["handoff"] = bench_handoff(args.handoff_size, args.repeat)
+        if "columnar" in suites:
+            print(f"Comparing TicketResponse and TicketBatch for {args.handoff_size} tickets...")
+            results["columnar"] = bench_columnar(args.handoff_size, args.aits, args.repeat)
+        if "serialization" in suites:
+            print(f"Timing JSON encoding of {args.handoff_size} tickets...")
+            results["serialization"] = bench_serialization(args.handoff_size, args.repeat)
+        if "api" in suites:
+            print(f"Load testing the API ({args.requests} requests x {args.concurrency} concurrent)...")
+            results["api"] = asyncio.run(bench_api(ticket_file, apphq_file, args.requests, args.concurrency))
+        results["llm"] = {name: REGISTRY.summary()[name] for name in
+                          ("iam_llm_calls_total", "iam_llm_tokens_total", "iam_tool_parse_failures_total")}
+
+    out = args.out or os.path.join(BACKEND_DIR, "benchmarks", "results",
+                                   datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+
+    cache_check = results.get("orchestrator", {}).get("llm_cache")
+    if cache_check and cache_check["repeat_misses"]:
+        print(f"CHECK FAILED: repeat agent run missed the LLM cache {cache_check['repeat_misses']} times")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']})")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# benchmarks/synthetic_data.py
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+# ✅ Owners the app owner check accepts by default (AppOwnerCheckerAgent.allowed_spaces)
+ALLOWED_SPACES = ["IAM-Space", "Security-Space"]
+
+DESCRIPTIONS = [
+    "Ensure ARM auto-provisioning for role {role} is enabled and evidence captured.",
+    "Review privileged access for role {role} and attach the recertification report.",
+    "Remove dormant accounts holding role {role} and confirm de-provisioning.",
+    "Validate segregation of duties for role {role} across production systems.",
+]
+
+def ait_numbers(count: int) -> list:
+    return [f"AIT-{9001 + i}" for i in range(count)]
+
+def _ait_weights(count: int, skew: float) -> list:
+    # Zipf-like: a few applications own most of the tickets when skew > 0
+    return [1.0 / (rank + 1) ** skew for rank in range(count)]
+
+def generate_apphq(ait_count: int, allowed_owner_ratio: float = 0.8, seed: int = 0) -> list:
+    """AppHQ records for AIT-9001.. in the apphq_data.json layout."""
+    rng = random.Random(seed)
+    records = []
+    for i, ait in enumerate(ait_numbers(ait_count)):
+        owner = (rng.choice(ALLOWED_SPACES) if rng.random() < allowed_owner_ratio
+                 else f"owner{i}@example.com")
+        contacts = [owner, f"ait{i}@example.com", f"lob{i % 25}@example.com"]
+        records.append({
+            "ait_number": ait,
+            "arm_id": f"ARM-{7788 + i}",
+            "application_name": f"Application {i}",
+            "application_owner": owner,
+            "ait_owner": contacts[1],
+            "lob_owner": contacts[2],
+            "contacts": contacts,
+        })
+    return records
+
+def generate_tickets(count: int, ait_count: int, category_weights: dict = None, ait_skew: float = 1.0,
+                     missing_ait_ratio: float = 0.05, seed: int = 0, start: date = date(2025, 11, 1)) -> list:
+    """Tickets in the ticket_data.json layout.
+
+    ``category_weights`` sets the category mix (e.g. ``{"IAM": 0.7, "APP": 0.3}``),
+    ``ait_skew`` how unevenly tickets spread over the AppHQ applications and
+    ``missing_ait_ratio`` the share pointing at AITs that AppHQ doesn't know.
+    """
+    rng = random.Random(seed)
+    category_weights = category_weights or {"IAM": 0.7, "APP": 0.3}
+    categories, weights = list(category_weights), list(category_weights.values())
+    aits = ait_numbers(ait_count)
+    ait_weights = _ait_weights(ait_count, ait_skew)
+
+    tickets = []
+    for i in range(count):
+        category = rng.choices(categories, weights)[0]
+        if rng.random() < missing_ait_ratio:
+            ait = f"AIT-{90000 + i}"
+        else:
+            ait = rng.choices(aits, ait_weights)[0]
+        created = start + timedelta(days=rng.randrange(30))
+        tickets.append({
+            "ticket_id": f"REQ{i + 1:06d}",
+            "jira_story": f"JIRA-{12345 + i}",
+            "ait_number": ait,
+            "deliverableType": f"{category} Category",
+            "category": category,
+            "risk_level": rng.choice(["High", "Medium", "Low"]),
+            "sla_deadline": (created + timedelta(days=rng.randint(1, 30))).isoformat(),
+            "created_on": created.isoformat(),
+            "description": rng.choice(DESCRIPTIONS).format(role=f"R{rng.randrange(500):03d}"),
+            "arm_id": f"ARM-{7788 + rng.randrange(ait_count)}",
+        })
+    return tickets
+
+def write_dataset(out_dir: str, tickets: int, aits: int, category_weights: dict = None, ait_skew: float = 1.0,
+                  missing_ait_ratio: float = 0.05, allowed_owner_ratio: float = 0.8, seed: int = 0,
+                  data_format: str = "json") -> tuple:
+    """Write ticket_data and apphq_data files; returns (ticket_file, apphq_file)."""
+    os.makedirs(out_dir, exist_ok=True)
+    ticket_records = generate_tickets(tickets, aits, category_weights, ait_skew, missing_ait_ratio, seed)
+    apphq_records = generate_apphq(aits, allowed_owner_ratio, seed)
+
+    ticket_file = os.path.join(out_dir, "ticket_data.ndjson" if data_format == "ndjson" else "ticket_data.json")
+    with open(ticket_file, "w") as f:
+        if data_format == "ndjson":
+            f.writelines(json.dumps(record) + "\n" for record in ticket_records)
+        else:
+            json.dump(ticket_records, f, indent=2)
+
+    apphq_file = os.path.join(out_dir, "apphq_data.json")
+    with open(apphq_file, "w") as f:
+        json.dump(apphq_records, f, indent=2)
+    return ticket_file, apphq_file
+
+def parse_weights(value: str) -> dict:
+    """Parse "IAM=0.7,APP=0.3" into {"IAM": 0.7, "APP": 0.3}."""
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def add_dataset_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--tickets", type=int, default=1000, help="number of tickets to generate")
+    parser.add_argument("--aits", type=int, default=100, help="number of AppHQ applications")
+    parser.add_argument("--categories", type=parse_weights, default={"IAM": 0.7, "APP": 0.3},
+                        help='category mix, e.g. "IAM=0.7,APP=0.3"')
+    parser.add_argument("--ait-skew", type=float, default=1.0, help="0 = tickets spread evenly over AITs")
+    parser.add_argument("--missing-ait-ratio", type=float, default=0.05)
+    parser.add_argument("--allowed-owner-ratio", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+
+def dataset_kwargs(args) -> dict:
+    return {
+        "tickets": args.tickets, "aits": args.aits, "category_weights": args.categories,
+        "ait_skew": args.ait_skew, "missing_ait_ratio": args.missing_ait_ratio,
+        "allowed_owner_ratio": args.allowed_owner_ratio, "seed": args.seed, "data_format": args.format,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic ticket_data / apphq_data files")
+    add_dataset_arguments(parser)
+    parser.add_argument("--out", default="benchmarks/data")
+    args = parser.parse_args()
+    ticket_file, apphq_file = write_dataset(args.out, **dataset_kwargs(args))
+    print(f"Wrote {args.tickets} tickets to {ticket_file} and {args.aits} AppHQ records to {apphq_file}")
@@ -1,8 +1,22 @@
 # config/loader.py
 import json
 import os
+import threading
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.json")
+
+_configs = {}
+_configs_lock = threading.Lock()
 
 def load_config(config_file=None):
-    config_file = config_file or os.path.join(os.path.dirname(__file__), "config.json")
+    config_file = config_file or DEFAULT_CONFIG_FILE
     with open(config_file, "r") as f:
         return json.load(f)
+
+def get_config(config_file=None) -> dict:
+    """Parsed config shared by every stage (parsed once per path)."""
+    path = os.path.abspath(config_file or DEFAULT_CONFIG_FILE)
+    with _configs_lock:
+        if path not in _configs:
+            _configs[path] = load_config(path)
+        return _configs[path]
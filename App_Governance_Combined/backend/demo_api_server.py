@@ -5,6 +5,10 @@ from typing import List, Dict, Any
 import asyncio
 import json
 from datetime import datetime
+from stores.apphq_repository import get_apphq_repository
+from realtime.connection_manager import ConnectionManager
+from stores.ticket_state import TicketStateStore, create_ticket_state_store
+from config.loader import get_config
 
 app = FastAPI(title="Ticket Portal API - Demo Mode", version="1.0.0")
 
@@ -18,29 +22,11 @@ app.add_middleware(
 )
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}")
-
 manager = ConnectionManager()
 
 # Global state for tickets
-current_tickets: Dict[str, Any] = {}
+# Replaced by the configured state store (memory or SQLite) on startup
+current_tickets: TicketStateStore = TicketStateStore()
 
 # Load tickets from JSON file (same as real mode)
 def load_tickets_from_json():
@@ -50,15 +36,16 @@ def load_tickets_from_json():
         with open("resources/ticket_data.json", "r") as f:
             tickets = json.load(f)
         
-        # Load AppHQ data
-        with open("resources/apphq_data.json", "r") as f:
-            apphq_data = json.load(f)
+        # Batch lookup in the shared AppHQ repository (indexed by ait_number)
+        apphq_data = get_apphq_repository("resources/apphq_data.json").lookup_many(
+            ticket.get("ait_number") for ticket in tickets
+        )
         
         # Convert to frontend format
         frontend_tickets = []
         for ticket in tickets:
             # Find matching AppHQ data by ait_number
-            apphq_info = next((app for app in apphq_data if app.get("ait_number") == ticket.get("ait_number")), {})
+            apphq_info = apphq_data.get(ticket.get("ait_number"), {})
             
             # Convert to frontend format
             frontend_ticket = {
@@ -118,6 +105,7 @@ async def update_stage_progress(ticket_id: str, stage_index: int, status: str, m
             current_tickets[ticket_id]["status"] = "in-progress"
         elif status == "completed" and stage_index == 7:
             current_tickets[ticket_id]["status"] = "completed"
+        current_tickets.mark_dirty(ticket_id)
         
         await manager.broadcast({
             "type": "ticket_update",
@@ -217,6 +205,9 @@ async def process_individual_ticket(ticket_id: str):
 async def load_initial_tickets():
     """Load tickets on startup"""
     for mock_ticket in MOCK_TICKETS:
+        # Keep restored state for tickets we already know about
+        if mock_ticket["id"] in current_tickets:
+            continue
         ticket = create_ticket_with_stages(mock_ticket)
         # Mark first stage as completed (tickets are already fetched)
         ticket["stages"][0]["status"] = "completed"
@@ -286,11 +277,46 @@ async def get_ticket(ticket_id: str):
     else:
         return JSONResponse(status_code=404, content={"error": f"Ticket {ticket_id} not found"})
 
+def restore_ticket_state() -> int:
+    """Swap in the configured state store and load persisted tickets"""
+    global current_tickets
+    state_config = get_config().get("state_store", {})
+    if state_config.get("backend") == "sqlite":
+        # Keep demo state apart from the real server's state
+        state_config = {**state_config, "path": state_config.get("demo_path", "state/demo_ticket_state.db")}
+    current_tickets = create_ticket_state_store(state_config)
+    return current_tickets.load()
+
+def resume_interrupted_tickets() -> List[str]:
+    """Restart restored tickets that were mid-pipeline when the server stopped"""
+    resumed = []
+    for ticket_id, ticket in current_tickets.items():
+        if ticket["status"] != "in-progress" or ticket.get("waitingForReview"):
+            continue
+        # Rewind to the last completed stage so the interrupted one runs again
+        if ticket["stages"][ticket["currentStage"]]["status"] != "completed":
+            ticket["currentStage"] -= 1
+            current_tickets.mark_dirty(ticket_id)
+        asyncio.create_task(process_individual_ticket(ticket_id))
+        resumed.append(ticket_id)
+    return resumed
+
 @app.on_event("startup")
 async def startup_event():
     """Load tickets on startup"""
+    restored = restore_ticket_state()
+    if restored:
+        print(f"✅ Restored {restored} tickets from the state store")
+    asyncio.create_task(current_tickets.run_flusher())
     await load_initial_tickets()
     print("✅ Initial tickets loaded")
+    resumed = resume_interrupted_tickets()
+    if resumed:
+        print(f"✅ Resuming {len(resumed)} interrupted tickets")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    current_tickets.close()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -298,7 +324,7 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         # Send current tickets on connection
-        await websocket.send_json({
+        await manager.send(websocket, {
             "type": "initial_state",
             "tickets": list(current_tickets.values())
         })
@@ -307,7 +333,7 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send(websocket, {"type": "pong"})
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
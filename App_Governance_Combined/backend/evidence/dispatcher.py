@@ -0,0 +1,171 @@
+# evidence/dispatcher.py
+import asyncio
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import List, Optional, Tuple
+
+# Errors worth retrying: dropped connections, timeouts and 4xx replies
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    return isinstance(error, TRANSIENT_ERRORS)
+
+class RateLimiter:
+    """Token bucket limiting messages per second to one SMTP server."""
+
+    def __init__(self, rate_per_second: Optional[float], burst: int = 1):
+        self.rate = rate_per_second
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class SMTPSessionPool:
+    """Pool of persistent, already authenticated SMTP sessions.
+
+    Sessions are opened lazily (connect, STARTTLS, login once) and reused
+    across messages; a session that errors is closed and replaced.
+    """
+
+    def __init__(self, smtp_config: dict, size: int = 4):
+        self.smtp_config = smtp_config
+        self.size = size
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        config = self.smtp_config
+        session = smtplib.SMTP(config["server"], config["port"], timeout=config.get("timeout", 30))
+        try:
+            if config.get("use_tls", True):
+                session.starttls()
+            if config.get("password"):
+                session.login(config["user"], config["password"])
+        except Exception:
+            session.close()
+            raise
+        self.opened += 1
+        return session
+
+    def acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, session: smtplib.SMTP, healthy: bool = True):
+        if healthy:
+            self._idle.put(session)
+        else:
+            try:
+                session.close()
+            except Exception:
+                pass
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                session.quit()
+            except Exception:
+                session.close()
+
+class EvidenceDispatcher:
+    """Sends evidence emails concurrently over pooled SMTP sessions.
+
+    Sends are rate limited per server, transient failures are retried with
+    exponential backoff, and every message gets a delivery report.
+    """
+
+    def __init__(self, smtp_config: dict):
+        self.smtp_config = smtp_config
+        self.pool = SMTPSessionPool(smtp_config, size=smtp_config.get("pool_size", 4))
+        self.rate_limiter = RateLimiter(
+            smtp_config.get("rate_limit_per_second"), burst=smtp_config.get("rate_limit_burst", 1)
+        )
+        self.max_retries = smtp_config.get("max_retries", 3)
+        self.retry_backoff = smtp_config.get("retry_backoff_seconds", 0.5)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+
+    def send(self, ticket_id: Optional[str], msg: Message) -> dict:
+        """Send one message with retries and return its delivery report."""
+        start = time.perf_counter()
+        attempts = 0
+        error = None
+        while attempts <= self.max_retries:
+            attempts += 1
+            self.rate_limiter.acquire()
+            session = None
+            try:
+                session = self.pool.acquire()
+                session.send_message(msg)
+                self.pool.release(session)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if session is not None:
+                    # A refused recipient leaves the session usable; anything else may not
+                    self.pool.release(session, healthy=isinstance(e, smtplib.SMTPRecipientsRefused))
+                if not is_transient(e) or attempts > self.max_retries:
+                    break
+                time.sleep(self.retry_backoff * 2 ** (attempts - 1))
+
+        if error is not None:
+            print(f"Error sending email for ticket {ticket_id}: {error}")
+        return {
+            "ticket_id": ticket_id,
+            "to": msg["To"],
+            "status": "sent" if error is None else "failed",
+            "attempts": attempts,
+            "error": str(error) if error is not None else None,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def dispatch(self, messages: List[Tuple[str, Message]]) -> List[dict]:
+        """Send (ticket_id, message) pairs concurrently; reports keep input order."""
+        return list(self._executor.map(lambda item: self.send(*item), messages))
+
+    async def dispatch_async(self, messages: List[Tuple[str, Message]]) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(self._executor, self.send, ticket_id, msg)
+            for ticket_id, msg in messages
+        ])
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
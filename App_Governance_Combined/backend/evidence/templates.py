@@ -0,0 +1,126 @@
+# evidence/templates.py
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from string import Formatter
+from typing import Dict, List, Tuple
+
+from schemas.ticket_context import Ticket, TicketResponse
+
+DEFAULT_RECIPIENT = "app_owner@example.com"
+
+# Built-in templates; config.json "evidence_templates.templates" can add or override them.
+# Placeholders are Ticket field names, e.g. {ticket_id} or {sla_deadline}.
+DEFAULT_TEMPLATES = {
+    "default": {
+        "subject": "IAM Deliverable {ticket_id} – Evidence Required",
+        "body": """
+        Dear Owner,
+
+        Please provide completion evidence for deliverable {ticket_id} ({description}).
+        SLA Deadline: {sla_deadline}
+        Risk Level: {risk_level}
+
+        Regards,
+        IAM Governance Team
+        """,
+    },
+    "urgent": {
+        "subject": "URGENT: IAM Deliverable {ticket_id} – Evidence Required by {sla_deadline}",
+        "body": """
+        Dear Owner,
+
+        Deliverable {ticket_id} ({description}) is at {risk_level} risk of missing its SLA.
+        Please provide completion evidence before {sla_deadline}.
+
+        Regards,
+        IAM Governance Team
+        """,
+    },
+}
+
+CONVERSIONS = {"s": str, "r": repr, "a": ascii}
+TEMPLATE_FIELDS = frozenset(Ticket.model_fields)
+
+class CompiledTemplate:
+    """A str.format-style template parsed once into literal/field parts.
+
+    Placeholders must be Ticket fields, so a typo fails at startup rather
+    than with a KeyError while rendering the first email.
+    """
+
+    def __init__(self, source: str, name: str = "evidence"):
+        self.source = source
+        self.parts: List[Tuple[str, str, str, str]] = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and field not in TEMPLATE_FIELDS:
+                raise ValueError(f"Unknown placeholder '{{{field}}}' in {name} template; use a Ticket field name")
+            self.parts.append((literal, field, spec or "", conversion))
+
+    def render(self, values: dict) -> str:
+        out = []
+        for literal, field, spec, conversion in self.parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            if conversion:
+                value = CONVERSIONS[conversion](value)
+            out.append(format(value, spec))
+        return "".join(out)
+
+class EvidenceTemplateRenderer:
+    """Renders evidence emails from templates compiled once at startup.
+
+    A ticket's template is chosen by risk level first, then deliverable
+    type, then "default" (see the "evidence_templates" config section).
+    """
+
+    def __init__(self, config: dict = None, sender: str = None):
+        config = config or {}
+        self.sender = sender
+        sources = {**DEFAULT_TEMPLATES, **config.get("templates", {})}
+        self.templates: Dict[str, Tuple[CompiledTemplate, CompiledTemplate]] = {
+            name: (CompiledTemplate(t["subject"], name), CompiledTemplate(t["body"], name))
+            for name, t in sources.items()
+        }
+        self.by_risk_level = {k.lower(): v for k, v in config.get("by_risk_level", {}).items()}
+        self.by_deliverable_type = {k.lower(): v for k, v in config.get("by_deliverable_type", {}).items()}
+        for name in (*self.by_risk_level.values(), *self.by_deliverable_type.values()):
+            if name not in self.templates:
+                raise ValueError(f"Unknown evidence template '{name}'")
+
+    def template_name(self, ticket: Ticket) -> str:
+        return (self.by_risk_level.get((ticket.risk_level or "").lower())
+                or self.by_deliverable_type.get((ticket.deliverableType or "").lower())
+                or "default")
+
+    @staticmethod
+    def recipient(ticket: Ticket) -> str:
+        # Prefer application_owner, then first contact, then default
+        recipient = ticket.application_owner
+        if not recipient and ticket.contacts:
+            recipient = ticket.contacts[0]
+        return recipient or DEFAULT_RECIPIENT
+
+    def render(self, ticket: Ticket) -> dict:
+        subject, body = self.templates[self.template_name(ticket)]
+        values = ticket.__dict__
+        return {
+            "ticket_id": ticket.ticket_id,
+            "to": [self.recipient(ticket)],
+            "subject": subject.render(values),
+            "body": body.render(values),
+        }
+
+    def render_batch(self, tickets: TicketResponse) -> List[dict]:
+        """Render every ticket's email in one pass, without building MIME objects."""
+        return [self.render(t) for t in tickets.tickets]
+
+    def to_mime(self, email: dict) -> MIMEMultipart:
+        """Build the MIME message for a rendered email (only needed to send it)."""
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = email["to"][0]
+        msg["Subject"] = email["subject"]
+        msg.attach(MIMEText(email["body"], "plain"))
+        return msg
@@ -0,0 +1,35 @@
+# metrics/llm_callbacks.py
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics.registry import LLM_CALLS, LLM_ERRORS, LLM_TOKENS
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Counts chat model calls, errors and token usage per model."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def on_llm_end(self, response, **kwargs):
+        LLM_CALLS.inc(model=self.model)
+        prompt, completion = self._token_usage(response)
+        if prompt:
+            LLM_TOKENS.inc(prompt, model=self.model, type="prompt")
+        if completion:
+            LLM_TOKENS.inc(completion, model=self.model, type="completion")
+
+    def on_llm_error(self, error, **kwargs):
+        LLM_ERRORS.inc(model=self.model)
+
+    @staticmethod
+    def _token_usage(response):
+        # OpenAI-style llm_output first, then per-message usage metadata
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += metadata.get("input_tokens", 0)
+                completion += metadata.get("output_tokens", 0)
+        return prompt, completion
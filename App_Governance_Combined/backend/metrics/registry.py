@@ -0,0 +1,224 @@
+# metrics/registry.py
+import math
+import threading
+from typing import Callable, Dict, Iterable, Tuple
+
+# Seconds; spans direct-mode tool calls (ms) up to slow LLM round trips
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {",".join(key) or "total": value for key, value in self._values.items()}
+
+class Gauge(_Metric):
+    """A value set directly, or read from ``callback`` at scrape time.
+
+    The callback returns a number, or ``{label_value_tuple: number}`` for a
+    labelled gauge.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), callback: Callable = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _current(self) -> Dict[Tuple[str, ...], float]:
+        if self.callback is None:
+            with self._lock:
+                return dict(self._values)
+        try:
+            value = self.callback()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return {}
+        if isinstance(value, dict):
+            return {tuple(str(v) for v in (k if isinstance(k, tuple) else (k,))): n for k, n in value.items()}
+        return {(): value}
+
+    def samples(self) -> list:
+        return [(self.name, key, value) for key, value in self._current().items()]
+
+    def summary(self) -> dict:
+        return {",".join(key) or "value": value for key, value in self._current().items()}
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key, cumulative, f'le="{_format_value(bound)}"'))
+            samples.append((f"{self.name}_sum", key, state[-2]))
+            samples.append((f"{self.name}_count", key, state[-1]))
+        return samples
+
+    def _quantile(self, state: list, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        count = state[-1]
+        rank, cumulative, lower = q * count, 0, 0.0
+        for bound, bucket_count in zip(self.buckets, state):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound if bound != math.inf else lower
+        return lower
+
+    def summary(self) -> dict:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        return {
+            ",".join(key) or "all": {
+                "count": state[-1],
+                "avg_ms": round(state[-2] / state[-1] * 1000, 3) if state[-1] else 0.0,
+                "p50_ms": round(self._quantile(state, 0.5) * 1000, 3),
+                "p95_ms": round(self._quantile(state, 0.95) * 1000, 3),
+                "p99_ms": round(self._quantile(state, 0.99) * 1000, 3),
+            }
+            for key, state in items
+        }
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered as Prometheus text or a JSON summary."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = (), callback: Callable = None) -> Gauge:
+        gauge = self._register(Gauge(name, help_text, labelnames, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.header())
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else ""
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        return {name: metric.summary() for name, metric in list(self._metrics.items())}
+
+REGISTRY = MetricsRegistry()
+
+# ✅ Pipeline metrics shared by the orchestrator, the agents and the API server
+STAGE_LATENCY = REGISTRY.histogram(
+    "iam_stage_latency_seconds", "Latency of one orchestrator stage call", ("stage", "mode"))
+STAGE_ERRORS = REGISTRY.counter(
+    "iam_stage_errors_total", "Orchestrator stage calls that raised", ("stage", "mode"))
+TICKET_STAGE_LATENCY = REGISTRY.histogram(
+    "iam_ticket_stage_latency_seconds", "Per-ticket stage time in the API pipeline, including queueing", ("stage",))
+TICKETS_PROCESSED = REGISTRY.counter(
+    "iam_ticket_stage_results_total", "Tickets finished per API pipeline stage by outcome", ("stage", "outcome"))
+LLM_CALLS = REGISTRY.counter(
+    "iam_llm_calls_total", "Chat model calls", ("model",))
+LLM_ERRORS = REGISTRY.counter(
+    "iam_llm_errors_total", "Chat model calls that raised", ("model",))
+LLM_TOKENS = REGISTRY.counter(
+    "iam_llm_tokens_total", "Tokens reported by the chat model", ("model", "type"))
+TOOL_PARSE_FAILURES = REGISTRY.counter(
+    "iam_tool_parse_failures_total", "Agent results whose tool output could not be parsed", ("tool", "reason"))
+TICKET_JSON_CACHE = REGISTRY.counter(
+    "iam_ticket_json_cache_total", "Per-ticket encoded JSON lookups by result", ("result",))
+
+def record_parse_failure(tool: str, reason: str = "invalid"):
+    """Count an agent result that did not yield a usable tool output."""
+    TOOL_PARSE_FAILURES.inc(tool=tool, reason=reason)
@@ -1,21 +1,106 @@
-from agents.human_approval import HumanApprovalAgent
-from agents.ticket_fetcher import TicketFetcherAgent
-from agents.category_checker import CategoryCheckerAgent
-from agents.sla_prioritizer import SLAPrioritizerAgent
-from agents.apphq_portal import AppHQResolverAgent
-from agents.app_owner_check import AppOwnerCheckerAgent
-from agents.evidence_collector import EvidenceCollectorAgent
-from agents.closer import CloserAgent
-from agents.logger import LoggerAgent
-from config.loader import load_config
+from config.loader import get_config
 from schemas.ticket_context import TicketResponse
-from langchain_openai import ChatOpenAI
+from pipeline.priority_queue import order_by_sla
+from pipeline.incremental import FINGERPRINTED_STAGES, StageFingerprints
+from pipeline.stage_dag import PIPELINE_DAG, StageDAG
+from stores.apphq_repository import get_apphq_repository
+from metrics.registry import STAGE_ERRORS, STAGE_LATENCY
+from audit.log import audit_record, create_audit_log
+from functools import cached_property
+import asyncio
+import importlib
+import threading
+import time
+
+# ✅ Execution modes a stage can run in:
+#    "agent"  -> LLM agent loop that calls the tool
+#    "direct" -> call the deterministic tool function in-process
+EXECUTION_MODES = ("agent", "direct")
+
+PIPELINE_STAGES = [
+    "fetcher",
+    "categorizer",
+    "sla",
+    "ownership",
+    "app_space_checker",
+    "evidence",
+    "closer",
+    "logger",
+]
+
+# ✅ stage -> (module, agent class); imported and built the first time the stage runs
+STAGE_AGENTS = {
+    "fetcher": ("agents.ticket_fetcher", "TicketFetcherAgent"),
+    "categorizer": ("agents.category_checker", "CategoryCheckerAgent"),
+    "sla": ("agents.sla_prioritizer", "SLAPrioritizerAgent"),
+    "ownership": ("agents.apphq_portal", "AppHQResolverAgent"),
+    "app_space_checker": ("agents.app_owner_check", "AppOwnerCheckerAgent"),
+    "evidence": ("agents.evidence_collector", "EvidenceCollectorAgent"),
+    "closer": ("agents.closer", "CloserAgent"),
+    "logger": ("agents.logger", "LoggerAgent"),
+}
 
 class IAMOrchestrator:
-    def __init__(self, api_key, config_file=None):
-        
-        # ✅ Load config.json
-        self.config = load_config(config_file)
+    def __init__(self, api_key, config_file=None, config=None):
+        # ✅ Where startup time goes: config parse, agent imports/builds, LLM client
+        self.startup_report = {"config_ms": 0.0, "llm_ms": None, "agents": {}}
+        start = time.perf_counter()
+
+        # ✅ Load config.json once; every stage shares this parsed object
+        #    (an explicit config dict, e.g. from the benchmark harness, wins)
+        self.config = config if config is not None else get_config(config_file)
+        self.startup_report["config_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        self.api_key = api_key
+        self._agents_lock = threading.RLock()
+
+        # ✅ Structured per-ticket stage history (JSONL, buffered, rotated)
+        self.audit_log = create_audit_log(self.config.get("audit", {}))
+
+        # ✅ Streaming ingestion settings (chunk size / JSON or NDJSON input)
+        self.ingest_config = self.config.get("ingest", {})
+        self.chunk_size = self.ingest_config.get("chunk_size", 500)
+
+        #self.human_approval = HumanApprovalAgent(llm=llm)
+
+        # ✅ Per-stage execution mode from config.json
+        execution = self.config.get("execution", {})
+        self.default_mode = execution.get("default_mode", "agent")
+        self.stage_modes = dict(execution.get("stages", {}))
+        self.agent_latency_estimate_ms = execution.get("agent_latency_estimate_ms")
+        for stage in PIPELINE_STAGES:
+            self.stage_mode(stage)
+
+        # stage -> mode -> {"calls": int, "total_ms": float, "last_ms": float}
+        self.stage_timings = {}
+        self._timings_lock = threading.Lock()
+
+        # ✅ Stages 2-8 as a dependency graph; independent stages run side by side
+        self.dag = StageDAG(PIPELINE_DAG, max_parallel=execution.get("max_parallel_stages", 4))
+        self.tail_dag = self.dag.subgraph(["evidence", "closer", "logger"])
+        self.last_dag_report = None
+
+        # ✅ Per-ticket stage input fingerprints so a refresh reruns only what changed
+        incremental = self.config.get("incremental", {})
+        self.incremental = incremental.get("enabled", True)
+        self.fingerprints = StageFingerprints(
+            apphq_lookup=lambda ait: get_apphq_repository(self.ownership.data_file).lookup(ait),
+            allowed_spaces=lambda: self.app_space_checker.allowed_spaces,
+            max_outputs=incremental.get("max_kept_outputs", 10000)
+        )
+
+    @cached_property
+    def llm_cache(self):
+        """Response cache so repeat prompts cost no tokens; created along with the LLM."""
+        # ✅ Imported here: the cache module pulls in langchain_core, which direct mode never needs
+        from stores.llm_cache import create_llm_cache
+        return create_llm_cache(self.config.get("llm_cache", {}))
+
+    @cached_property
+    def llm(self):
+        """The shared chat model, created the first time a stage runs in agent mode."""
+        start = time.perf_counter()
+        from langchain_openai import ChatOpenAI
+        from metrics.llm_callbacks import LLMMetricsHandler
 
         # ✅ Step 1: Initialize your LLM once
         # llm = ChatOpenAI(
@@ -24,25 +109,59 @@ class IAMOrchestrator:
         #     api_key= api_key,
         #     base_url="https://openrouter.ai/api/v1"
         # )
-
         llm = ChatOpenAI(
             model=self.config["llm"]["model"],
             temperature=self.config["llm"]["temperature"],
-            api_key=api_key,
+            api_key=self.api_key,
             base_url=self.config["llm"]["base_url"],
-            max_tokens=500
+            max_tokens=500,
+            cache=self.llm_cache,
+            callbacks=[LLMMetricsHandler(self.config["llm"]["model"])]
         )
+        self.startup_report["llm_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return llm
 
-        # ✅ Pass LLM into agents
-        self.fetcher = TicketFetcherAgent(llm=llm)
-        self.categorizer = CategoryCheckerAgent(llm=llm)
-        self.sla = SLAPrioritizerAgent(llm=llm)
-        self.ownership = AppHQResolverAgent(llm=llm)
-        self.app_space_checker = AppOwnerCheckerAgent(llm=llm)
-        self.evidence = EvidenceCollectorAgent(llm=llm)
-        self.closer = CloserAgent(llm=llm)
-        self.logger = LoggerAgent(llm=llm)
-        #self.human_approval = HumanApprovalAgent(llm=llm)
+    def _agent_kwargs(self, stage: str) -> dict:
+        if stage == "fetcher":
+            return {"chunk_size": self.chunk_size, "data_format": self.ingest_config.get("format")}
+        if stage == "sla":
+            return {"sla_config": self.config.get("sla")}
+        if stage == "evidence":
+            return {"config": self.config}
+        if stage == "logger":
+            return {"audit_log": self.audit_log}
+        return {}
+
+    def agent(self, stage: str, with_llm: bool = False):
+        """The agent for a stage, imported and built on first use.
+
+        The chat model is only attached when the stage runs in agent mode, so
+        an all-direct pipeline never loads LangChain or the OpenAI client.
+        """
+        agent = self.__dict__.get(stage)
+        if agent is None or (with_llm and agent.llm is None):
+            with self._agents_lock:
+                agent = self.__dict__.get(stage)
+                if agent is None:
+                    start = time.perf_counter()
+                    module_name, class_name = STAGE_AGENTS[stage]
+                    agent_class = getattr(importlib.import_module(module_name), class_name)
+                    imported = time.perf_counter()
+                    agent = agent_class(llm=None, **self._agent_kwargs(stage))
+                    self.startup_report["agents"][stage] = {
+                        "import_ms": round((imported - start) * 1000, 3),
+                        "build_ms": round((time.perf_counter() - imported) * 1000, 3),
+                    }
+                    self.__dict__[stage] = agent
+                if with_llm and agent.llm is None:
+                    agent.llm = self.llm
+        return agent
+
+    def __getattr__(self, name):
+        # self.fetcher, self.sla, ... resolve to lazily built agents
+        if name in STAGE_AGENTS:
+            return self.agent(name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
 
     # def checkpoint(self, stage: str, tickets: TicketResponse):
     #     """Check config if HITL required for this stage."""
@@ -50,66 +169,314 @@ class IAMOrchestrator:
     #         return self.human_approval.invoke(tickets, stage)
     #     return None
 
-    def run(self):
+    def stage_mode(self, stage: str) -> str:
+        """Return the configured execution mode for a pipeline stage."""
+        mode = self.stage_modes.get(stage, self.default_mode)
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}' for stage '{stage}'")
+        return mode
+
+    def run_stage(self, stage: str, *args, **kwargs):
+        """Run a pipeline stage in its configured mode and record its latency."""
+        mode = self.stage_mode(stage)
+        agent = self.agent(stage, with_llm=mode == "agent")
+        tracked = self.incremental and stage in FINGERPRINTED_STAGES and args
+        if tracked:
+            self.fingerprints.record(stage, args[0].tickets)
+        start = time.perf_counter()
+        try:
+            if mode == "direct":
+                result = agent.run_tool(*args, **kwargs)
+            else:
+                # Tie cached LLM responses to the ticket payload of this call
+                from stores.llm_cache import fingerprint_payload, ticket_fingerprint
+                token = ticket_fingerprint.set(fingerprint_payload(stage, *args, **kwargs))
+                try:
+                    result = agent.invoke(*args, **kwargs)
+                finally:
+                    ticket_fingerprint.reset(token)
+        except Exception as e:
+            STAGE_ERRORS.inc(stage=stage, mode=mode)
+            self._audit_stage(stage, mode, args, None, (time.perf_counter() - start) * 1000, e)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record_timing(stage, mode, elapsed_ms)
+        self._audit_stage(stage, mode, args, result, elapsed_ms)
+        if tracked:
+            self.fingerprints.remember_outputs(stage, result.tickets)
+        return result
+
+    async def arun_stage(self, stage: str, *args, **kwargs):
+        """Async run_stage: agent mode awaits the LangChain async path.
+
+        Direct mode awaits the agent's ``arun_tool`` when it has one (file
+        reads, SMTP); otherwise the in-process tool function runs inline.
+        """
+        mode = self.stage_mode(stage)
+        agent = self.agent(stage, with_llm=mode == "agent")
+        tracked = self.incremental and stage in FINGERPRINTED_STAGES and args
+        if tracked:
+            self.fingerprints.record(stage, args[0].tickets)
+        start = time.perf_counter()
+        try:
+            if mode == "direct":
+                if hasattr(agent, "arun_tool"):
+                    result = await agent.arun_tool(*args, **kwargs)
+                else:
+                    result = agent.run_tool(*args, **kwargs)
+            else:
+                from stores.llm_cache import fingerprint_payload, ticket_fingerprint
+                token = ticket_fingerprint.set(fingerprint_payload(stage, *args, **kwargs))
+                try:
+                    result = await agent.ainvoke(*args, **kwargs)
+                finally:
+                    ticket_fingerprint.reset(token)
+        except Exception as e:
+            STAGE_ERRORS.inc(stage=stage, mode=mode)
+            self._audit_stage(stage, mode, args, None, (time.perf_counter() - start) * 1000, e)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record_timing(stage, mode, elapsed_ms)
+        self._audit_stage(stage, mode, args, result, elapsed_ms)
+        if tracked:
+            self.fingerprints.remember_outputs(stage, result.tickets)
+        return result
+
+    def _audit_stage(self, stage: str, mode: str, args: tuple, result, elapsed_ms: float, error: Exception = None):
+        """One audit record per input ticket: completed, dropped by the stage, or error."""
+        # The fetcher has no ticket input and the logger writes its own records
+        if stage in ("fetcher", "logger") or not args or not isinstance(args[0], TicketResponse):
+            return
+        tickets = args[0].tickets
+        kept = {t.ticket_id for t in result.tickets} if isinstance(result, TicketResponse) else None
+        actor = "agent" if mode == "agent" else "pipeline"
+        records = []
+        for t in tickets:
+            if error is not None:
+                outcome = "error"
+            elif kept is None or t.ticket_id in kept:
+                outcome = "completed"
+            else:
+                outcome = "dropped"
+            records.append(audit_record(
+                t.ticket_id, stage, outcome, elapsed_ms, actor,
+                message=str(error) if error is not None else None, batch_size=len(tickets)
+            ))
+        self.audit_log.write(*records)
+
+    def close(self):
+        """Flush and release the audit log and LLM cache."""
+        self.audit_log.close()
+        # Only close a cache that agent mode actually opened
+        cache = self.__dict__.get("llm_cache")
+        if cache is not None:
+            cache.close()
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters for the LLM response cache."""
+        if "llm_cache" not in self.__dict__:
+            # No stage has run in agent mode yet, so the cache isn't open
+            return {"backend": self.config.get("llm_cache", {}).get("backend", "none"), "opened": False}
+        if self.llm_cache is None:
+            return {"backend": None}
+        return self.llm_cache.stats()
+
+    def _record_timing(self, stage: str, mode: str, elapsed_ms: float):
+        STAGE_LATENCY.observe(elapsed_ms / 1000, stage=stage, mode=mode)
+        with self._timings_lock:
+            stats = self.stage_timings.setdefault(stage, {}).setdefault(
+                mode, {"calls": 0, "total_ms": 0.0, "last_ms": 0.0}
+            )
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["last_ms"] = elapsed_ms
+
+    def latency_report(self) -> dict:
+        """Per-stage average latency and the time saved by running it directly.
+
+        Savings are measured against the observed agent-mode average for the
+        stage, or ``agent_latency_estimate_ms`` from config when the stage has
+        never run through the agent.
+        """
+        report = {}
+        for stage, modes in self.stage_timings.items():
+            averages = {mode: stats["total_ms"] / stats["calls"] for mode, stats in modes.items()}
+            entry = {
+                "mode": self.stage_mode(stage),
+                "calls": {mode: stats["calls"] for mode, stats in modes.items()},
+                "avg_ms": {mode: round(avg, 3) for mode, avg in averages.items()},
+                "saved_ms_per_call": None,
+            }
+            if "direct" in averages:
+                baseline = averages.get("agent", self.agent_latency_estimate_ms)
+                if baseline is not None:
+                    entry["saved_ms_per_call"] = round(baseline - averages["direct"], 3)
+            report[stage] = entry
+        return report
+
+    def iter_ticket_chunks(self, chunk_size: int = None):
+        """Stream fetched IAM tickets in TicketResponse chunks of chunk_size."""
+        chunks = self.fetcher.iter_chunks(chunk_size or self.chunk_size)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self._record_timing("fetcher", "direct", (time.perf_counter() - start) * 1000)
+            if chunk is None:
+                return
+            yield chunk
+
+    def run_chunks(self, chunk_size: int = None):
+        """Run the pipeline over each streamed chunk, yielding one result per chunk."""
+        for chunk in self.iter_ticket_chunks(chunk_size):
+            yield self.run_pipeline(chunk)
+
+    def run(self, chunk_size: int = None):
+        # ✅ Streaming mode: consume ticket_data chunk by chunk
+        if chunk_size or self.ingest_config.get("streaming", False):
+            return self._merge_results(self.run_chunks(chunk_size))
+
         # Step 1: Fetch tickets
-        tickets = self.fetcher.invoke()
+        tickets = self.run_stage("fetcher")
+        return self.run_pipeline(tickets)
 
-        # ✅ If no IAM tickets, skip rest of pipeline and log
-        if not tickets.tickets:
-            logs = self.logger.invoke(TicketResponse(tickets=[]),"No tickets found")
-            return {"tickets": [], "emails": [], "logs": logs}
+    def refresh(self, chunk_size: int = None) -> dict:
+        """Re-fetch tickets and rerun only the stages whose inputs changed.
+
+        Each changed ticket re-enters the pipeline at its first changed stage
+        with the earlier stage outputs it already had; unchanged tickets are
+        not run again. The result also lists the stage each ticket reran from.
+        """
+        seen, rerun = set(), {}
+        if chunk_size or self.ingest_config.get("streaming", False):
+            chunks = self.iter_ticket_chunks(chunk_size)
+        else:
+            chunks = [self.run_stage("fetcher")]
+
+        def refreshed_chunks():
+            for chunk in chunks:
+                seen.update(t.ticket_id for t in chunk.tickets)
+                plan = self.fingerprints.plan(chunk.tickets)
+                rerun.update(plan)
+                yield self.run_pipeline_from(
+                    [t for t in chunk.tickets if t.ticket_id in plan], plan
+                )
+
+        result = self._merge_results(refreshed_chunks())
+        # Tickets no longer in ticket_data are dropped from the index
+        self.fingerprints.forget(set(self.fingerprints.tracked()) - seen)
+        result["rerun"] = rerun
+        return result
+
+    def run_pipeline_from(self, tickets: list, start_stages: dict) -> dict:
+        """Run tickets through the pipeline, each starting at start_stages[ticket_id]."""
+        groups = {stage: [] for stage in FINGERPRINTED_STAGES}
+        for t in tickets:
+            stage = start_stages[t.ticket_id]
+            resumed = self.fingerprints.resume_input(t, stage)
+            if resumed is None:
+                stage, resumed = FINGERPRINTED_STAGES[0], t
+            groups[stage].append(resumed)
 
-        # Step 2: Categortize tickets
-        categorized = self.categorizer.invoke(tickets)
+        # Tickets join the run at their own stage and carry on from there
+        carried = []
+        for stage in FINGERPRINTED_STAGES:
+            batch = carried + groups[stage]
+            carried = self.run_stage(stage, TicketResponse.of(batch)).tickets if batch else []
 
+        if not carried:
+            logs = self.run_stage("logger", TicketResponse(tickets=[]), "No changed tickets to re-run")
+            return {"tickets": [], "emails": [], "logs": logs, "timings": self.latency_report()}
+        return self._finish_pipeline(TicketResponse.of(order_by_sla(carried)))
+
+    async def arun(self, chunk_size: int = None) -> dict:
+        """Async run(): same pipeline, with stages awaited on the event loop."""
+        if chunk_size or self.ingest_config.get("streaming", False):
+            chunks = self.iter_ticket_chunks(chunk_size)
+            results = []
+            while True:
+                # Chunk reads stay off the event loop
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                results.append(await self.arun_pipeline(chunk))
+            return self._merge_results(results)
+
+        tickets = await self.arun_stage("fetcher")
+        return await self.arun_pipeline(tickets)
+
+    def _merge_results(self, results) -> dict:
+        tickets, emails, logs = [], [], []
+        merged_any = False
+        for result in results:
+            merged_any = True
+            if result["tickets"]:
+                tickets.extend(result["tickets"].tickets)
+            if result["emails"]:
+                emails.extend(result["emails"]["emails"])
+            logs.extend(result["logs"].get("logs", []))
+
+        if not merged_any:
+            return self.run_pipeline(TicketResponse(tickets=[]))
+
+        return {
+            "tickets": TicketResponse.of(tickets) if tickets else [],
+            "emails": {"emails": emails} if emails else [],
+            "logs": {"logs": logs},
+            "timings": self.latency_report(),
+            "dag": self.last_dag_report
+        }
+
+    def run_pipeline(self, tickets: TicketResponse) -> dict:
+        """Run stages 2-8 over already fetched tickets."""
         # ✅ If no IAM tickets, skip rest of pipeline and log
-        if not categorized.tickets:
-            logs = self.logger.invoke(TicketResponse(tickets=[]),"No IAM category tickets found")
-            return {"tickets": [], "emails": [], "logs": logs}
-        
-        # Step 3: Prioritize SLA
-        prioritized = self.sla.invoke(categorized)
-
-        #✅ Checkpoint for HITL after SLA prioritization
+        if not tickets.tickets:
+            logs = self.run_stage("logger", TicketResponse(tickets=[]),"No tickets found")
+            return {"tickets": [], "emails": [], "logs": logs, "timings": self.latency_report()}
+
+        #✅ Checkpoints for HITL (SLA, Ownership, EvidenceCollector, Closer)
         # hitl = self.checkpoint("SLA", prioritized)
         # if hitl: return hitl
 
-        # Step 4: Enrich with App HQ details
-        enriched = self.ownership.invoke(prioritized)
+        return self._run_dag(self.dag, tickets)
 
-        if not enriched.tickets:
-            logs = self.logger.invoke(TicketResponse(tickets=[]),"No AIT owners details found")
-            return {"tickets": [], "emails": [], "logs": logs}
-        
-         #✅ Checkpoint for HITL after Ownership enrichment
-        # hitl = self.checkpoint("Ownership", enriched)
-        # if hitl: return hitl
+    async def arun_pipeline(self, tickets: TicketResponse) -> dict:
+        """Async run_pipeline over already fetched tickets."""
+        if not tickets.tickets:
+            logs = await self.arun_stage("logger", TicketResponse(tickets=[]),"No tickets found")
+            return {"tickets": [], "emails": [], "logs": logs, "timings": self.latency_report()}
 
-        # Step 5: Filter by App Owner space
-        filtered = self.app_space_checker.invoke(enriched)
+        run = await self.dag.arun(tickets.tickets, self.arun_stage)
+        logs = None
+        if run["stopped"] is not None:
+            logs = await self.arun_stage("logger", TicketResponse(tickets=[]), run["stopped"].empty_message)
+        return self._dag_result(run, logs)
 
-        if not filtered.tickets:
-            logs = self.logger.invoke(TicketResponse(tickets=[]),"No App owners in our space")
-            return {"tickets": [], "emails": [], "logs": logs}
-        
-        #✅ Checkpoint for HITL after App Owner space check
-        # hitl = self.checkpoint("EvidenceCollector", filtered)
-        # if hitl: return hitl
+    def _finish_pipeline(self, filtered: TicketResponse) -> dict:
+        """Stages 6-8 for tickets that passed the app owner space check."""
+        return self._run_dag(self.tail_dag, filtered)
 
-        #✅ Mock mode (just prepare emails)
-        #✅ Real mode (send via SMTP) send=True
-        
-        #Step 6: Collect evidence emails
-        emails = self.evidence.invoke(filtered, send=False)
-        
-        #✅ Checkpoint for HITL after Evidence Collection
-        # hitl = self.checkpoint("Closer", filtered)
-        # if hitl: return hitl
+    def _run_dag(self, dag: StageDAG, tickets: TicketResponse) -> dict:
+        #✅ Mock mode (just prepare emails); evidence runs with send=False
+        run = dag.run(tickets.tickets, self.run_stage)
+        logs = None
+        if run["stopped"] is not None:
+            logs = self.run_stage("logger", TicketResponse(tickets=[]), run["stopped"].empty_message)
+        return self._dag_result(run, logs)
 
-        # Step 7: Close tickets
-        closed = self.closer.invoke(filtered)
+    def _dag_result(self, run: dict, stopped_logs: dict = None) -> dict:
+        self.last_dag_report = run["report"]
 
-        # Step 8: Always log at the end
-        logs = self.logger.invoke(closed)
+        # ✅ A filter stage dropped every ticket: log why and stop
+        if run["stopped"] is not None:
+            return {"tickets": [], "emails": [], "logs": stopped_logs, "timings": self.latency_report(),
+                    "dag": self.last_dag_report}
 
-        return {"tickets": filtered, "emails": emails, "logs": logs}
+        return {
+            "tickets": TicketResponse.of(run["tickets"]),
+            "emails": run["outputs"].get("emails"),
+            "logs": run["outputs"].get("logs"),
+            "timings": self.latency_report(),
+            "dag": self.last_dag_report
+        }
@@ -0,0 +1,105 @@
+# pipeline/batch_scheduler.py
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from schemas.ticket_context import Ticket
+from pipeline.priority_queue import ticket_priority
+
+# run_batch(stage_index, [(ticket_id, ticket), ...]) -> tickets that move on to the next stage
+BatchRunner = Callable[[int, List[Tuple[str, Ticket]]], Awaitable[List[Tuple[str, Ticket]]]]
+
+class BatchScheduler:
+    """Groups tickets waiting at the same stage into micro-batches.
+
+    Each stage has its own queue and worker. A worker takes the first waiting
+    ticket, keeps collecting until ``max_batch_size`` tickets are queued or
+    ``max_wait_ms`` has passed, and runs the stage once for the whole batch.
+    Tickets returned by the runner are queued for the next stage, so
+    different batches can be at different stages at the same time. Each
+    stage queue is ordered by SLA risk and deadline, so urgent tickets fill
+    the next batch ahead of less urgent ones that arrived earlier.
+    """
+
+    def __init__(self, run_batch: BatchRunner, first_stage: int, last_stage: int,
+                 max_batch_size: int = 50, max_wait_ms: float = 50):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.run_batch = run_batch
+        self.first_stage = first_stage
+        self.last_stage = last_stage
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues: Dict[int, asyncio.PriorityQueue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._in_flight = set()
+        self._counter = itertools.count()
+
+    def _queue(self, stage_index: int) -> asyncio.PriorityQueue:
+        if stage_index not in self._queues:
+            self._queues[stage_index] = asyncio.PriorityQueue()
+            self._workers[stage_index] = asyncio.create_task(self._worker(stage_index))
+        return self._queues[stage_index]
+
+    def _put(self, stage_index: int, ticket_id: str, ticket: Ticket):
+        # Counter keeps FIFO order between equally urgent tickets
+        item = (ticket_priority(ticket), next(self._counter), ticket_id, ticket)
+        self._queue(stage_index).put_nowait(item)
+
+    def is_scheduled(self, ticket_id: str) -> bool:
+        return ticket_id in self._in_flight
+
+    def submit(self, ticket_id: str, ticket: Ticket, stage_index: int) -> bool:
+        """Queue a ticket at stage_index. Returns False if it is already in flight."""
+        if ticket_id in self._in_flight:
+            return False
+        if not self.first_stage <= stage_index <= self.last_stage:
+            raise ValueError(f"Stage {stage_index} is outside the batched pipeline")
+        self._in_flight.add(ticket_id)
+        self._put(stage_index, ticket_id, ticket)
+        return True
+
+    def pending(self) -> int:
+        """Number of tickets anywhere in the batched pipeline."""
+        return len(self._in_flight)
+
+    def depths(self) -> Dict[int, int]:
+        """Number of tickets waiting at each stage."""
+        return {stage: queue.qsize() for stage, queue in self._queues.items()}
+
+    async def _collect(self, queue: asyncio.PriorityQueue) -> List[Tuple[str, Ticket]]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already queued before waiting for stragglers
+            while not queue.empty() and len(batch) < self.max_batch_size:
+                batch.append(queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return [(ticket_id, ticket) for _, _, ticket_id, ticket in batch]
+
+    async def _worker(self, stage_index: int):
+        queue = self._queues[stage_index]
+        while True:
+            batch = await self._collect(queue)
+            try:
+                advanced = await self.run_batch(stage_index, batch)
+            except Exception as e:
+                print(f"Error running stage {stage_index} batch: {e}")
+                advanced = []
+
+            advanced_ids = set()
+            if stage_index < self.last_stage:
+                for ticket_id, ticket in advanced:
+                    advanced_ids.add(ticket_id)
+                    self._put(stage_index + 1, ticket_id, ticket)
+            # Tickets that stopped here (error, review pause or done) leave the pipeline
+            for ticket_id, _ in batch:
+                if ticket_id not in advanced_ids:
+                    self._in_flight.discard(ticket_id)
@@ -0,0 +1,133 @@
+# pipeline/incremental.py
+import copy
+import hashlib
+import json
+from typing import Callable, Dict, Iterable, List, Optional
+
+from schemas.ticket_context import Ticket
+from pipeline.stage_dag import PIPELINE_DAG
+
+# Stages whose per-ticket inputs are fingerprinted, in pipeline order.
+# Evidence, closure and logging depend on all of them and rerun whenever
+# any of them does.
+FINGERPRINTED_STAGES = ("categorizer", "sla", "ownership", "app_space_checker")
+
+# Ticket fields each stage writes, merged onto a freshly fetched ticket when
+# the pipeline resumes after that stage
+STAGE_OUTPUT_FIELDS = {node.name: node.writes for node in PIPELINE_DAG if node.name in FINGERPRINTED_STAGES}
+
+def _digest(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+class StageFingerprints:
+    """Per-ticket, per-stage input fingerprints and the last stage outputs.
+
+    A stage's fingerprint covers only what that stage reads: the category,
+    the SLA fields, the AppHQ record for the ticket's AIT and the allowed
+    owner spaces. ``dirty_stage`` compares a refreshed ticket against what
+    was recorded and returns the first stage that has to run again.
+    """
+
+    def __init__(self, apphq_lookup: Callable[[str], Optional[dict]],
+                 allowed_spaces: Callable[[], Iterable[str]], max_outputs: int = 10000):
+        self.apphq_lookup = apphq_lookup
+        self.allowed_spaces = allowed_spaces
+        # ticket_id -> {stage: fingerprint}
+        self._fingerprints: Dict[str, Dict[str, str]] = {}
+        # ticket_id -> copy of the ticket with the latest output of each stage,
+        # least recently written first; the oldest are dropped past max_outputs
+        self._outputs: Dict[str, Ticket] = {}
+        self.max_outputs = max(max_outputs, 0)
+
+    def compute(self, stage: str, ticket: Ticket) -> str:
+        if stage == "categorizer":
+            return _digest(ticket.category)
+        if stage == "sla":
+            return _digest(ticket.category, ticket.sla_deadline)
+        record = self.apphq_lookup(ticket.ait_number) if ticket.ait_number else None
+        if stage == "ownership":
+            return _digest(ticket.ait_number, record)
+        if stage == "app_space_checker":
+            owner = record.get("application_owner") if record else ticket.application_owner
+            return _digest(owner, sorted(self.allowed_spaces()))
+        raise ValueError(f"Stage '{stage}' has no fingerprinted inputs")
+
+    def record(self, stage: str, tickets: Iterable[Ticket]):
+        """Record the inputs a stage is about to run with."""
+        for t in tickets:
+            self._fingerprints.setdefault(t.ticket_id, {})[stage] = self.compute(stage, t)
+
+    def remember_outputs(self, stage: str, tickets: Iterable[Ticket]):
+        """Keep the fields stage wrote, for resuming after it later."""
+        fields = STAGE_OUTPUT_FIELDS[stage]
+        for t in tickets:
+            kept = self._outputs.pop(t.ticket_id, None)
+            if kept is None:
+                kept = t.model_copy(deep=True)
+            else:
+                for field in fields:
+                    setattr(kept, field, copy.deepcopy(getattr(t, field)))
+            self._outputs[t.ticket_id] = kept
+        # A ticket whose outputs were dropped just reruns from the categorizer
+        while len(self._outputs) > self.max_outputs:
+            del self._outputs[next(iter(self._outputs))]
+
+    def dirty_stage(self, ticket: Ticket) -> Optional[str]:
+        """First stage whose inputs changed for ticket, or None if nothing did.
+
+        Unknown tickets start from the categorizer. A stage the ticket never
+        reached is skipped: the earlier stage that stopped it is unchanged.
+        """
+        recorded = self._fingerprints.get(ticket.ticket_id)
+        if recorded is None:
+            return FINGERPRINTED_STAGES[0]
+        for stage in FINGERPRINTED_STAGES:
+            previous = recorded.get(stage)
+            if previous is None:
+                return None
+            if previous != self.compute(stage, ticket):
+                return stage
+        return None
+
+    def plan(self, tickets: Iterable[Ticket]) -> Dict[str, str]:
+        """{ticket_id: first stage to rerun} for every ticket with changed inputs."""
+        plan = {}
+        for t in tickets:
+            stage = self.dirty_stage(t)
+            if stage is not None:
+                plan[t.ticket_id] = stage
+        return plan
+
+    def resume_input(self, ticket: Ticket, stage: str) -> Optional[Ticket]:
+        """The refreshed ticket with the outputs of the stages before stage merged in.
+
+        Returns None if no earlier output was kept for the ticket.
+        """
+        index = FINGERPRINTED_STAGES.index(stage)
+        if index == 0:
+            return ticket
+        previous = self._outputs.get(ticket.ticket_id)
+        if previous is None:
+            return None
+        fields = {}
+        for earlier in FINGERPRINTED_STAGES[:index]:
+            for field in STAGE_OUTPUT_FIELDS[earlier]:
+                fields[field] = getattr(previous, field)
+        return ticket.model_copy(update=fields)
+
+    def forget(self, ticket_ids: Iterable[str]):
+        for ticket_id in ticket_ids:
+            self._fingerprints.pop(ticket_id, None)
+            self._outputs.pop(ticket_id, None)
+
+    def forget_outputs(self, ticket_ids: Iterable[str]):
+        """Drop kept stage outputs (e.g. once a ticket completes); fingerprints stay."""
+        for ticket_id in ticket_ids:
+            self._outputs.pop(ticket_id, None)
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def tracked(self) -> List[str]:
+        return list(self._fingerprints)
@@ -0,0 +1,116 @@
+# pipeline/priority_queue.py
+import heapq
+import itertools
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from schemas.ticket_context import Ticket
+
+# Lower rank is served first; unknown risk goes last
+RISK_RANK = {"high": 0, "medium": 1, "low": 2}
+UNKNOWN_RISK_RANK = 3
+
+def utc_timestamp(moment: datetime) -> float:
+    """Epoch seconds, reading naive datetimes as UTC like the SLA engine's utcnow()."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def deadline_timestamp(sla_deadline: Optional[str]) -> float:
+    """Sortable deadline; unparseable deadlines sort after every real one."""
+    try:
+        return utc_timestamp(datetime.fromisoformat(sla_deadline))
+    except (TypeError, ValueError):
+        return math.inf
+
+def sla_priority(sla_deadline: Optional[str], risk_level: Optional[str]) -> Tuple[int, float]:
+    return RISK_RANK.get((risk_level or "").lower(), UNKNOWN_RISK_RANK), deadline_timestamp(sla_deadline)
+
+def ticket_priority(ticket: Ticket) -> Tuple[int, float]:
+    return sla_priority(ticket.sla_deadline, ticket.risk_level)
+
+def order_by_sla(tickets: List[Ticket]) -> List[Ticket]:
+    """Most urgent first: by risk level, then by SLA deadline (stable)."""
+    return sorted(tickets, key=ticket_priority)
+
+class SLAPriorityQueue:
+    """Heap of ticket IDs ordered by risk level, then SLA deadline.
+
+    Changing a queued ticket's deadline or risk is O(log n): the old heap
+    entry is marked removed and a new one pushed (lazy deletion), so High
+    tickets always come out ahead of Low ones regardless of arrival order.
+    """
+
+    _REMOVED = object()
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+
+    def push(self, ticket_id: str, sla_deadline: Optional[str], risk_level: Optional[str]):
+        """Add a ticket, or re-prioritize it if it is already queued."""
+        if ticket_id in self._entries:
+            self.remove(ticket_id)
+        rank, deadline = sla_priority(sla_deadline, risk_level)
+        entry = [rank, deadline, next(self._counter), ticket_id, sla_deadline, risk_level]
+        self._entries[ticket_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def update(self, ticket_id: str, sla_deadline: Optional[str], risk_level: Optional[str]) -> bool:
+        """Re-prioritize a queued ticket; returns False if it isn't queued."""
+        if ticket_id not in self._entries:
+            return False
+        self.push(ticket_id, sla_deadline, risk_level)
+        return True
+
+    def remove(self, ticket_id: str) -> bool:
+        entry = self._entries.pop(ticket_id, None)
+        if entry is None:
+            return False
+        entry[3] = self._REMOVED
+        return True
+
+    def _prune(self):
+        while self._heap and self._heap[0][3] is self._REMOVED:
+            heapq.heappop(self._heap)
+
+    def pop(self) -> Optional[str]:
+        """Remove and return the most urgent ticket ID, or None when empty."""
+        self._prune()
+        if not self._heap:
+            return None
+        entry = heapq.heappop(self._heap)
+        del self._entries[entry[3]]
+        return entry[3]
+
+    def peek(self) -> Optional[dict]:
+        """The queue head without removing it."""
+        self._prune()
+        if not self._heap:
+            return None
+        _, _, _, ticket_id, sla_deadline, risk_level = self._heap[0]
+        return {"ticket_id": ticket_id, "sla_deadline": sla_deadline, "risk_level": risk_level}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ticket_id) -> bool:
+        return ticket_id in self._entries
+
+    def predicted_breaches(self, seconds_per_ticket: float, workers: int = 1, now: datetime = None) -> int:
+        """How many queued tickets would miss their SLA at the current throughput.
+
+        Tickets are served in queue order, ``workers`` at a time, each taking
+        ``seconds_per_ticket``.
+        """
+        now_ts = utc_timestamp(now or datetime.utcnow())
+        workers = max(workers, 1)
+        ordered = sorted(entry for entry in self._entries.values())
+        breaches = 0
+        for position, entry in enumerate(ordered):
+            finish = now_ts + (position // workers + 1) * seconds_per_ticket
+            if finish > entry[1]:
+                breaches += 1
+        return breaches
@@ -0,0 +1,56 @@
+# pipeline/review_queue.py
+import time
+from typing import Dict, Iterator, List, Optional
+
+from pipeline.priority_queue import sla_priority
+
+REVIEW_ORDERS = ("waiting", "sla")
+
+class ReviewQueue:
+    """Tickets paused for human review, with when each one started waiting.
+
+    Listing and bulk approval only touch the waiting tickets instead of
+    scanning the whole state store. Tickets come out oldest first, or most
+    urgent SLA first with ``order="sla"``.
+    """
+
+    def __init__(self):
+        # ticket_id -> epoch seconds it started waiting; dict order is arrival order
+        self._waiting: Dict[str, float] = {}
+
+    def add(self, ticket_id: str, since: float = None):
+        if ticket_id not in self._waiting:
+            self._waiting[ticket_id] = since or time.time()
+
+    def discard(self, ticket_id: str) -> bool:
+        return self._waiting.pop(ticket_id, None) is not None
+
+    def waiting_since(self, ticket_id: str) -> Optional[float]:
+        return self._waiting.get(ticket_id)
+
+    def ordered(self, tickets: Dict[str, dict], order: str = "waiting") -> List[str]:
+        """Waiting ticket IDs in review order; tickets maps IDs to their state."""
+        if order not in REVIEW_ORDERS:
+            raise ValueError(f"order must be one of {', '.join(REVIEW_ORDERS)}")
+        ticket_ids = [ticket_id for ticket_id in self._waiting if ticket_id in tickets]
+        if order == "sla":
+            # sorted() is stable, so equally urgent tickets stay oldest first
+            ticket_ids.sort(key=lambda ticket_id: sla_priority(
+                tickets[ticket_id].get("slaDeadline"), tickets[ticket_id].get("priority")
+            ))
+        return ticket_ids
+
+    def oldest_age(self, now: float = None) -> float:
+        """Seconds the longest-waiting ticket has been waiting (0 when empty)."""
+        if not self._waiting:
+            return 0.0
+        return (now or time.time()) - min(self._waiting.values())
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def __contains__(self, ticket_id) -> bool:
+        return ticket_id in self._waiting
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._waiting)
@@ -0,0 +1,169 @@
+# pipeline/sla_engine.py
+import re
+from datetime import date, datetime, timedelta
+from typing import FrozenSet, List, Optional, Sequence
+
+from schemas.ticket_context import TicketResponse
+
+try:
+    import numpy as np
+except ImportError:  # Fall back to the per-ticket loop
+    np = None
+
+RISK_LABELS = ["High", "Medium", "Low", "Unknown"]
+UNKNOWN = 3
+
+# Naive ISO dates/datetimes that numpy parses exactly like datetime.fromisoformat;
+# anything else (offsets, week dates, compact forms, ...) takes the scalar path.
+FAST_DEADLINE = re.compile(
+    r"\d{4}-\d{2}-\d{2}"
+    r"(?:[T ](?:[01]\d|2[0-3])(?::[0-5]\d(?::[0-5]\d(?:\.\d{3}|\.\d{6})?)?)?)?"
+)
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+def parse_weekmask(weekmask) -> FrozenSet[int]:
+    """Business weekdays (0=Mon) from a numpy-style weekmask: "Mon Tue ...", "1111100" or 7 flags."""
+    if isinstance(weekmask, str) and re.fullmatch(r"[01]{7}", weekmask):
+        workdays = frozenset(i for i, flag in enumerate(weekmask) if flag == "1")
+    elif isinstance(weekmask, str):
+        days = re.findall(r"[A-Z][a-z]{2}", weekmask)
+        if "".join(days) != re.sub(r"\s", "", weekmask) or any(d not in WEEKDAYS for d in days):
+            raise ValueError(f"Invalid SLA weekmask '{weekmask}'")
+        workdays = frozenset(WEEKDAYS.index(d) for d in days)
+    else:
+        flags = list(weekmask)
+        if len(flags) != 7:
+            raise ValueError(f"Invalid SLA weekmask {weekmask!r}")
+        workdays = frozenset(i for i, flag in enumerate(flags) if flag)
+    if not workdays:
+        raise ValueError("SLA weekmask must have at least one business day")
+    return workdays
+
+def busday_count(begin: date, end: date, workdays: FrozenSet[int], holidays: FrozenSet[date]) -> int:
+    """Pure-Python ``np.busday_count``: business days in [begin, end), negative if end is earlier."""
+    if begin > end:
+        # numpy counts (end, begin] and negates it
+        return -busday_count(end + timedelta(days=1), begin + timedelta(days=1), workdays, holidays)
+    weeks, rest = divmod((end - begin).days, 7)
+    count = weeks * len(workdays) + sum(1 for k in range(rest) if (begin.weekday() + k) % 7 in workdays)
+    return count - sum(1 for h in holidays if begin <= h < end and h.weekday() in workdays)
+
+class SLAEngine:
+    """Assigns SLA risk tiers to whole ticket batches at once.
+
+    Deadlines are parsed into one datetime64 array and compared against a
+    single reference time; tiers come from vectorized threshold checks.
+    Thresholds can be overridden per category, and days left can be counted
+    in business days. With the default config the result matches
+    ``prioritize_tickets_by_sla``.
+    """
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        defaults = config.get("thresholds", {})
+        self.high_days = defaults.get("high_days", 2)
+        self.medium_days = defaults.get("medium_days", 5)
+        self.by_category = {
+            category.upper(): (
+                overrides.get("high_days", self.high_days),
+                overrides.get("medium_days", self.medium_days),
+            )
+            for category, overrides in config.get("by_category", {}).items()
+        }
+        self.business_days = config.get("business_days", False)
+        self.weekmask = config.get("weekmask", "Mon Tue Wed Thu Fri")
+        self.holidays = config.get("holidays", [])
+        if self.business_days and np is None:
+            # ✅ Parsed up front so a bad weekmask/holiday fails at load, not as Unknown risk per ticket
+            self._workdays = parse_weekmask(self.weekmask)
+            self._holiday_dates = frozenset(date.fromisoformat(str(h)) for h in self.holidays)
+
+    def thresholds(self, category: Optional[str]):
+        return self.by_category.get((category or "").upper(), (self.high_days, self.medium_days))
+
+    def _scalar_days_left(self, deadline: str, now: datetime) -> Optional[int]:
+        try:
+            due = datetime.fromisoformat(deadline)
+            if self.business_days:
+                if np is None:
+                    return busday_count(now.date(), due.date(), self._workdays, self._holiday_dates)
+                return int(np.busday_count(now.date(), due.date(), weekmask=self.weekmask, holidays=self.holidays))
+            return (due - now).days
+        except Exception:
+            return None
+
+    def _tier(self, days_left: Optional[int], category: Optional[str]) -> int:
+        if days_left is None:
+            return UNKNOWN
+        high, medium = self.thresholds(category)
+        return 0 if days_left <= high else 1 if days_left <= medium else 2
+
+    def days_left(self, deadlines: Sequence[str], now: datetime):
+        """Whole days (or business days) until each deadline, plus a validity mask."""
+        days = np.zeros(len(deadlines), dtype=np.int64)
+        valid = np.zeros(len(deadlines), dtype=bool)
+        fast = np.fromiter(
+            (isinstance(d, str) and FAST_DEADLINE.fullmatch(d) is not None for d in deadlines),
+            dtype=bool, count=len(deadlines)
+        )
+        fast_idx = np.flatnonzero(fast)
+        if len(fast_idx):
+            try:
+                due = np.array([deadlines[i] for i in fast_idx], dtype="datetime64[us]")
+            except ValueError:
+                # e.g. an impossible date like 2025-02-30; let the scalar path decide
+                fast[fast_idx] = False
+                fast_idx = fast_idx[:0]
+            else:
+                reference = np.datetime64(now, "us")
+                if self.business_days:
+                    days[fast_idx] = np.busday_count(
+                        reference.astype("datetime64[D]"), due.astype("datetime64[D]"),
+                        weekmask=self.weekmask, holidays=self.holidays
+                    )
+                else:
+                    # Floor division matches timedelta.days for negative deltas too
+                    days[fast_idx] = (due - reference).astype(np.int64) // 86_400_000_000
+                valid[fast_idx] = True
+        for i in np.flatnonzero(~fast):
+            result = self._scalar_days_left(deadlines[i], now)
+            if result is not None:
+                days[i] = result
+                valid[i] = True
+        return days, valid
+
+    def risk_levels(self, deadlines: Sequence[str], categories: Sequence[str], now: datetime = None) -> List[str]:
+        """Risk tier label for each deadline."""
+        now = now or datetime.utcnow()
+        if np is None:
+            return [
+                RISK_LABELS[self._tier(self._scalar_days_left(d, now), c)]
+                for d, c in zip(deadlines, categories)
+            ]
+        if not len(deadlines):
+            return []
+
+        days, valid = self.days_left(deadlines, now)
+        if self.by_category:
+            unique, inverse = np.unique(
+                np.array([(c or "").upper() for c in categories], dtype=object).astype(str),
+                return_inverse=True
+            )
+            per_category = np.array([self.thresholds(c) for c in unique], dtype=np.int64)
+            high, medium = per_category[inverse, 0], per_category[inverse, 1]
+        else:
+            high, medium = self.high_days, self.medium_days
+
+        tiers = np.where(days <= high, 0, np.where(days <= medium, 1, 2))
+        tiers[~valid] = UNKNOWN
+        return np.array(RISK_LABELS, dtype=object)[tiers].tolist()
+
+    def prioritize(self, tickets: TicketResponse, now: datetime = None) -> TicketResponse:
+        """Batch equivalent of prioritize_tickets_by_sla."""
+        levels = self.risk_levels(
+            [t.sla_deadline for t in tickets.tickets], [t.category for t in tickets.tickets], now
+        )
+        for t, level in zip(tickets.tickets, levels):
+            t.risk_level = level
+        return TicketResponse.of(list(tickets.tickets))
@@ -0,0 +1,255 @@
+# pipeline/stage_dag.py
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List
+
+from schemas.ticket_context import Ticket, TicketResponse
+from pipeline.priority_queue import order_by_sla
+
+class StageNode:
+    """One pipeline stage: what it waits for and what it contributes.
+
+    ``writes`` lists the ticket fields the stage sets; only those are merged
+    back, so stages running side by side cannot overwrite each other.
+    ``filters`` stages also drop tickets. ``produces`` names a non-ticket
+    result (emails, logs) instead.
+    """
+
+    def __init__(self, name: str, deps: Iterable[str] = (), writes: Iterable[str] = (),
+                 filters: bool = False, produces: str = None, empty_message: str = None,
+                 kwargs: dict = None):
+        self.name = name
+        self.deps = tuple(deps)
+        self.writes = tuple(writes)
+        self.filters = filters
+        self.produces = produces
+        self.empty_message = empty_message
+        self.kwargs = kwargs or {}
+
+# ✅ Stages 2-8. SLA scoring and AppHQ enrichment both only need the IAM
+# tickets, and closing and logging don't wait for the evidence emails.
+PIPELINE_DAG = [
+    StageNode("categorizer", writes=("deliverableType",), filters=True,
+              empty_message="No IAM category tickets found"),
+    StageNode("sla", deps=("categorizer",), writes=("risk_level",)),
+    StageNode("ownership", deps=("categorizer",),
+              writes=("application_name", "application_owner", "lob_owner", "ait_owner", "contacts"),
+              filters=True, empty_message="No AIT owners details found"),
+    StageNode("app_space_checker", deps=("ownership",), filters=True,
+              empty_message="No App owners in our space"),
+    StageNode("evidence", deps=("sla", "app_space_checker"), produces="emails", kwargs={"send": False}),
+    StageNode("closer", deps=("app_space_checker",), writes=("description",)),
+    StageNode("logger", deps=("sla", "app_space_checker"), produces="logs"),
+]
+
+class StageDAG:
+    """Runs pipeline stages as soon as the stages they depend on are done.
+
+    Each stage gets its own shallow copies of the tickets that passed every
+    filter upstream of it, carrying the fields its upstream stages wrote, and
+    its written fields are merged back into the shared tickets when it
+    finishes. Every run reports stage start and end
+    offsets and the critical path.
+    """
+
+    def __init__(self, nodes: List[StageNode], max_parallel: int = 4):
+        self.nodes = {node.name: node for node in nodes}
+        self.max_parallel = max(max_parallel, 1)
+        for node in nodes:
+            missing = [dep for dep in node.deps if dep not in self.nodes]
+            if missing:
+                raise ValueError(f"Stage '{node.name}' depends on unknown stages {missing}")
+        self.order = self._topological_order()
+        self.ancestors = {name: self._ancestors(name) for name in self.order}
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    def _ancestors(self, name: str) -> set:
+        found, stack = set(), list(self.nodes[name].deps)
+        while stack:
+            dep = stack.pop()
+            if dep not in found:
+                found.add(dep)
+                stack.extend(self.nodes[dep].deps)
+        return found
+
+    def subgraph(self, names: Iterable[str]) -> "StageDAG":
+        """The given stages only, with dependencies outside them dropped."""
+        names = set(names)
+        nodes = []
+        for name in self.order:
+            if name in names:
+                node = self.nodes[name]
+                nodes.append(StageNode(
+                    node.name, [dep for dep in node.deps if dep in names], node.writes,
+                    node.filters, node.produces, node.empty_message, node.kwargs
+                ))
+        return StageDAG(nodes, self.max_parallel)
+
+    def _inputs(self, name: str, tickets: Dict[str, Ticket], survivors: Dict[str, set],
+                initial: Dict[str, Ticket]) -> TicketResponse:
+        passed = [survivors[dep] for dep in self.ancestors[name] if dep in survivors]
+        # Only fields written by ancestors are taken from the merged tickets, so a
+        # stage's input doesn't depend on which unrelated stages happened to finish first
+        upstream = [field for dep in self.ancestors[name] for field in self.nodes[dep].writes]
+        batch = []
+        for ticket_id, t in initial.items():
+            if all(ticket_id in ids for ids in passed):
+                copy = t.model_copy()
+                for field in upstream:
+                    setattr(copy, field, getattr(tickets[ticket_id], field))
+                batch.append(copy)
+        if "sla" in self.ancestors[name]:
+            batch = order_by_sla(batch)
+        return TicketResponse.of(batch)
+
+    @staticmethod
+    def _timed(run_stage: Callable, node: StageNode, tickets: TicketResponse):
+        start = time.perf_counter()
+        result = run_stage(node.name, tickets, **node.kwargs)
+        return result, start, time.perf_counter()
+
+    @staticmethod
+    async def _atimed(arun_stage: Callable, node: StageNode, tickets: TicketResponse):
+        start = time.perf_counter()
+        result = await arun_stage(node.name, tickets, **node.kwargs)
+        return result, start, time.perf_counter()
+
+    def _ready(self, done: set, running: Iterable[StageNode]) -> List[StageNode]:
+        running = set(node.name for node in running)
+        return [self.nodes[name] for name in self.order
+                if name not in done and name not in running
+                and all(dep in done for dep in self.nodes[name].deps)]
+
+    @staticmethod
+    def _merge(node: StageNode, result, current: Dict[str, Ticket], survivors: Dict[str, set],
+               outputs: dict) -> bool:
+        """Fold a finished stage into the run; True if it filtered out every ticket."""
+        if node.produces:
+            outputs[node.produces] = result
+            return False
+        # ✅ Merge only the fields this stage owns
+        for t in result.tickets:
+            target = current.get(t.ticket_id)
+            if target is not None:
+                for field in node.writes:
+                    setattr(target, field, getattr(t, field))
+        if node.filters:
+            survivors[node.name] = {t.ticket_id for t in result.tickets}
+            return not survivors[node.name]
+        return False
+
+    def _result(self, current: Dict[str, Ticket], survivors: Dict[str, set], outputs: dict,
+                stopped: StageNode, spans: Dict[str, tuple], started_at: float) -> dict:
+        passed = [t for ticket_id, t in current.items() if all(ticket_id in ids for ids in survivors.values())]
+        return {
+            "tickets": order_by_sla(passed),
+            "outputs": outputs,
+            "stopped": stopped,
+            "report": self._report(spans, time.perf_counter() - started_at),
+        }
+
+    def run(self, tickets: List[Ticket], run_stage: Callable) -> dict:
+        """Run every stage over tickets with ``run_stage(name, tickets, **kwargs)``.
+
+        Stops launching stages once a filter drops every ticket and returns
+        that stage as ``stopped``.
+        """
+        current = {t.ticket_id: t for t in tickets}
+        initial = {t.ticket_id: t.model_copy() for t in tickets}
+        survivors, outputs, spans = {}, {}, {}
+        done, running, stopped = set(), {}, None
+        started_at = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="dag") as pool:
+            while True:
+                if stopped is None:
+                    for node in self._ready(done, running.values()):
+                        batch = self._inputs(node.name, current, survivors, initial)
+                        running[pool.submit(self._timed, run_stage, node, batch)] = node
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    result, start, end = future.result()
+                    spans[node.name] = (start - started_at, end - started_at)
+                    done.add(node.name)
+                    if self._merge(node, result, current, survivors, outputs) and stopped is None:
+                        stopped = node
+
+        return self._result(current, survivors, outputs, stopped, spans, started_at)
+
+    async def arun(self, tickets: List[Ticket], arun_stage: Callable) -> dict:
+        """Async run: independent stages are concurrent tasks on the event loop."""
+        current = {t.ticket_id: t for t in tickets}
+        initial = {t.ticket_id: t.model_copy() for t in tickets}
+        survivors, outputs, spans = {}, {}, {}
+        done, running, stopped = set(), {}, None
+        started_at = time.perf_counter()
+
+        try:
+            while True:
+                if stopped is None:
+                    for node in self._ready(done, running.values()):
+                        batch = self._inputs(node.name, current, survivors, initial)
+                        running[asyncio.create_task(self._atimed(arun_stage, node, batch))] = node
+                if not running:
+                    break
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    node = running.pop(task)
+                    result, start, end = task.result()
+                    spans[node.name] = (start - started_at, end - started_at)
+                    done.add(node.name)
+                    if self._merge(node, result, current, survivors, outputs) and stopped is None:
+                        stopped = node
+        finally:
+            for task in running:
+                task.cancel()
+
+        return self._result(current, survivors, outputs, stopped, spans, started_at)
+
+    def _report(self, spans: Dict[str, tuple], wall: float) -> dict:
+        """Per-stage offsets plus the chain of stages that bounded the run."""
+        path = []
+        if spans:
+            name = max(spans, key=lambda n: spans[n][1])
+            while name is not None:
+                path.append(name)
+                deps = [dep for dep in self.nodes[name].deps if dep in spans]
+                name = max(deps, key=lambda n: spans[n][1]) if deps else None
+            path.reverse()
+        return {
+            "wall_ms": round(wall * 1000, 3),
+            "stage_ms_total": round(sum(end - start for start, end in spans.values()) * 1000, 3),
+            "critical_path": path,
+            "critical_path_ms": round(sum(spans[n][1] - spans[n][0] for n in path) * 1000, 3),
+            "stages": {
+                name: {
+                    "deps": list(self.nodes[name].deps),
+                    "start_ms": round(start * 1000, 3),
+                    "end_ms": round(end * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                }
+                for name, (start, end) in spans.items()
+            },
+        }
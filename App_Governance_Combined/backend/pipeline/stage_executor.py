@@ -0,0 +1,114 @@
+# pipeline/stage_executor.py
+import asyncio
+import contextlib
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable
+
+class QueueFullError(Exception):
+    """Raised when the executor cannot accept more ticket jobs."""
+
+class StageExecutor:
+    """Dedicated thread pool for blocking stage calls with backpressure.
+
+    Each stage gets its own concurrency limit, so a slow stage (e.g. one in
+    agent mode) cannot take every thread. Ticket jobs are admitted through a
+    bounded queue; ``submit`` raises ``QueueFullError`` once ``max_queue``
+    jobs are pending so callers can reject the request instead of piling up
+    tasks.
+
+    By default the pool has one thread per stage slot: the sum of the limits
+    of ``stages`` and the configured stages, plus ``default_concurrency``
+    for any stage not named up front. Every stage can then run at its limit
+    at the same time without queueing for a thread.
+    """
+
+    def __init__(self, stage_concurrency: Dict[str, int] = None, default_concurrency: int = 4,
+                 max_queue: int = 200, max_workers: int = None, stages: Iterable[str] = ()):
+        self.stage_concurrency = stage_concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.max_queue = max_queue
+        self.max_workers = max_workers or sum(
+            self.stage_concurrency.get(stage, default_concurrency)
+            for stage in {*stages, *self.stage_concurrency}
+        ) + default_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending_jobs = set()
+        # stage -> {"waiting", "running", "calls", "total_wait_ms", "max_wait_ms"}
+        self._stage_stats: Dict[str, dict] = {}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(
+                self.stage_concurrency.get(stage, self.default_concurrency)
+            )
+        return self._semaphores[stage]
+
+    def _stats(self, stage: str) -> dict:
+        return self._stage_stats.setdefault(
+            stage, {"waiting": 0, "running": 0, "calls": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+        )
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, stage: str):
+        stats = self._stats(stage)
+        queued_at = time.perf_counter()
+        stats["waiting"] += 1
+        async with self._semaphore(stage):
+            stats["waiting"] -= 1
+            wait_ms = (time.perf_counter() - queued_at) * 1000
+            stats["calls"] += 1
+            stats["total_wait_ms"] += wait_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+            stats["running"] += 1
+            try:
+                yield
+            finally:
+                stats["running"] -= 1
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs):
+        """Run a blocking call for a stage once a slot for that stage is free."""
+        async with self._slot(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    async def run_async(self, stage: str, func: Callable[..., Awaitable], *args, **kwargs):
+        """Await a coroutine for a stage under the same per-stage limit, without a thread."""
+        async with self._slot(stage):
+            return await func(*args, **kwargs)
+
+    def has_capacity(self, jobs: int = 1) -> bool:
+        return len(self._pending_jobs) + jobs <= self.max_queue
+
+    def submit(self, job: Callable[[], Awaitable]) -> asyncio.Task:
+        """Schedule a ticket job, or raise QueueFullError if the queue is full."""
+        if not self.has_capacity():
+            raise QueueFullError(f"Ticket queue is full ({self.max_queue} pending jobs)")
+        task = asyncio.create_task(job())
+        self._pending_jobs.add(task)
+        task.add_done_callback(self._pending_jobs.discard)
+        return task
+
+    def stats(self) -> dict:
+        """Queue depth and per-stage wait times for sizing the pool."""
+        return {
+            "pending_jobs": len(self._pending_jobs),
+            "max_queue": self.max_queue,
+            "max_workers": self.max_workers,
+            "stages": {
+                stage: {
+                    "concurrency": self.stage_concurrency.get(stage, self.default_concurrency),
+                    "waiting": stats["waiting"],
+                    "running": stats["running"],
+                    "calls": stats["calls"],
+                    "avg_wait_ms": round(stats["total_wait_ms"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                    "max_wait_ms": round(stats["max_wait_ms"], 3),
+                }
+                for stage, stats in self._stage_stats.items()
+            },
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
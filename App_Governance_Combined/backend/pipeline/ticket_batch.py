@@ -0,0 +1,231 @@
+# pipeline/ticket_batch.py
+import sys
+from array import array
+from typing import Dict, Iterable, List, Sequence
+
+from schemas.ticket_context import Ticket, TicketResponse
+
+try:
+    import numpy as np
+except ImportError:  # Masks and row selections fall back to plain lists
+    np = None
+
+TICKET_FIELDS = tuple(Ticket.model_fields)
+# Free text is stored as is; every other field repeats across tickets and is interned
+TEXT_FIELDS = ("ticket_id", "description")
+LIST_FIELDS = ("contacts",)
+
+class CategoricalColumn:
+    """Dictionary-encoded column: each distinct value is stored once, rows hold int codes."""
+
+    def __init__(self):
+        self.values: List = []
+        self.lookup: Dict = {}
+        self.codes = array("i")
+
+    def encode(self, value) -> int:
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def get(self, row: int):
+        return self.values[self.codes[row]]
+
+    def set(self, row: int, value):
+        self.codes[row] = self.encode(value)
+
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+
+class TextColumn:
+    """Plain column for free-text fields that rarely repeat."""
+
+    def __init__(self):
+        self.values: List = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def get(self, row: int):
+        return self.values[row]
+
+    def set(self, row: int, value):
+        self.values[row] = value
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(v) for v in self.values)
+
+class TicketBatch:
+    """Column-oriented ticket batch, measured by the ``columnar`` benchmark.
+
+    Categorical fields (owners, LOB, category, deliverableType, contacts,
+    dates, ...) are dictionary-encoded, so a value shared by thousands of
+    tickets is stored once. A batch is a view: ``where(mask)`` returns a
+    batch over the selected rows of the same columns without copying any
+    ticket data, and ``assign`` writes through to those rows, just like
+    stages mutate Ticket objects in place today. Convert with
+    ``from_response`` / ``to_response`` at the edges.
+
+    The pipeline itself still passes TicketResponse between stages; this is
+    an experiment, not a production path.
+    """
+
+    def __init__(self, columns: Dict[str, object] = None, rows=None):
+        self._columns = columns if columns is not None else {
+            field: TextColumn() if field in TEXT_FIELDS else CategoricalColumn() for field in TICKET_FIELDS
+        }
+        # Row positions in the shared columns; None means every row
+        self._rows = rows
+
+    # ---- construction / conversion at the edges ----
+
+    def _append(self, values: dict):
+        for field in TICKET_FIELDS:
+            value = values.get(field)
+            if field in LIST_FIELDS:
+                value = tuple(value or ())
+            self._columns[field].append(value)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "TicketBatch":
+        """Ingest raw ticket dicts, validating each one once."""
+        batch = cls()
+        for record in records:
+            batch._append(dict(Ticket.model_validate(record)))
+        return batch
+
+    @classmethod
+    def from_response(cls, tickets: TicketResponse) -> "TicketBatch":
+        batch = cls()
+        for t in tickets.tickets:
+            batch._append(dict(t))
+        return batch
+
+    def to_response(self) -> TicketResponse:
+        """Materialize the selected rows as Ticket objects (no re-validation)."""
+        columns = [(field, self._columns[field]) for field in TICKET_FIELDS]
+        tickets = []
+        for row in self.row_positions():
+            values = {field: column.get(row) for field, column in columns}
+            for field in LIST_FIELDS:
+                values[field] = list(values[field])
+            tickets.append(Ticket.model_construct(**values))
+        return TicketResponse.of(tickets)
+
+    # ---- rows and columns ----
+
+    def row_positions(self) -> Sequence[int]:
+        if self._rows is None:
+            return range(len(self._columns["ticket_id"].values))
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self.row_positions())
+
+    @property
+    def ticket_ids(self) -> List[str]:
+        return self.column("ticket_id")
+
+    def column(self, field: str) -> list:
+        """Values of one field for the selected rows."""
+        column = self._columns[field]
+        values = [column.get(row) for row in self.row_positions()]
+        return [list(v) for v in values] if field in LIST_FIELDS else values
+
+    def distinct(self, field: str) -> list:
+        """Distinct values of a categorical field among the selected rows."""
+        column = self._columns[field]
+        return [column.values[code] for code in sorted(set(self._codes(field)))]
+
+    def _codes(self, field: str):
+        codes = self._columns[field].codes
+        if np is not None:
+            view = np.frombuffer(codes, dtype=np.int32) if len(codes) else np.zeros(0, dtype=np.int32)
+            return view if self._rows is None else view[self._rows]
+        return [codes[row] for row in self.row_positions()]
+
+    # ---- masks and views ----
+
+    def mask_isin(self, field: str, values: Iterable, ignore_case: bool = False):
+        """Boolean mask over the selected rows: field value is one of values."""
+        column = self._columns[field]
+        if isinstance(column, TextColumn):
+            wanted = set(values)
+            return self._mask(column.get(row) in wanted for row in self.row_positions())
+        if ignore_case:
+            wanted = {v.upper() for v in values}
+            codes = [code for code, v in enumerate(column.values) if isinstance(v, str) and v.upper() in wanted]
+        else:
+            codes = [column.lookup[v] for v in values if v in column.lookup]
+        row_codes = self._codes(field)
+        if np is not None:
+            return np.isin(row_codes, codes)
+        wanted_codes = set(codes)
+        return [code in wanted_codes for code in row_codes]
+
+    def mask_equals(self, field: str, value, ignore_case: bool = False):
+        return self.mask_isin(field, [value], ignore_case)
+
+    @staticmethod
+    def _mask(flags):
+        flags = list(flags)
+        return np.array(flags, dtype=bool) if np is not None else flags
+
+    def where(self, mask) -> "TicketBatch":
+        """View of the rows where mask is true; no ticket data is copied."""
+        rows = self.row_positions()
+        if np is not None:
+            rows = np.asarray(rows)[np.asarray(mask, dtype=bool)]
+        else:
+            rows = [row for row, keep in zip(rows, mask) if keep]
+        return TicketBatch(self._columns, rows)
+
+    def assign(self, field: str, values) -> "TicketBatch":
+        """Set field for the selected rows to one value or one value per row."""
+        column = self._columns[field]
+        rows = self.row_positions()
+        if isinstance(values, (list, tuple)) and field not in LIST_FIELDS:
+            for row, value in zip(rows, values):
+                column.set(row, value)
+        else:
+            if field in LIST_FIELDS:
+                values = tuple(values or ())
+            if isinstance(column, CategoricalColumn):
+                code = column.encode(values)
+                if np is not None and len(column.codes):
+                    # Writes straight into the shared array("i") buffer
+                    view = np.frombuffer(column.codes, dtype=np.int32)
+                    view[slice(None) if self._rows is None else self._rows] = code
+                else:
+                    for row in rows:
+                        column.codes[row] = code
+            else:
+                for row in rows:
+                    column.set(row, values)
+        return self
+
+    def assign_rows(self, field: str, by_row: Dict[int, object]):
+        """Set field for specific row positions ({row: value})."""
+        column = self._columns[field]
+        for row, value in by_row.items():
+            column.set(row, tuple(value or ()) if field in LIST_FIELDS else value)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the (shared) columns."""
+        return sum(column.nbytes() for column in self._columns.values())
+
+# ---- filter stages over a batch, benchmarked against the TicketResponse tools ----
+
+def filter_iam_batch(batch: TicketBatch) -> TicketBatch:
+    """filter_iam_tickets as one mask over the category codes; the result is a view."""
+    iam = batch.where(batch.mask_equals("category", "IAM", ignore_case=True))
+    return iam.assign("deliverableType", "IAM Category")
+
+def check_owner_space_batch(batch: TicketBatch, allowed_spaces: List[str]) -> TicketBatch:
+    """check_owner_space with membership checked once per distinct owner."""
+    return batch.where(batch.mask_isin("application_owner", [s for s in allowed_spaces if s]))
@@ -0,0 +1,86 @@
+# realtime/connection_manager.py
+import asyncio
+from typing import Dict
+
+from fastapi import WebSocket
+
+from realtime.json_codec import dumps_text
+
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+class ClientConnection:
+    """One WebSocket with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task = None
+
+class ConnectionManager:
+    """Fans messages out to WebSocket clients without blocking on any of them.
+
+    Each message is serialized once (with orjson when it is installed) and
+    put on every client's queue; a per-client writer task drains it. A
+    client whose queue overflows is dropped (closed with 1013) so it can
+    reconnect and catch up via replay instead of holding back everyone else.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.dropped_clients = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._write(client))
+        self.active_connections[websocket] = client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client and client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    async def _write(self, client: ClientConnection):
+        try:
+            while True:
+                text = await client.queue.get()
+                await client.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error broadcasting to client: {e}")
+            self.disconnect(client.websocket)
+
+    def _enqueue(self, client: ClientConnection, text: str):
+        try:
+            client.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            print("Dropping slow WebSocket client (outbound queue full)")
+            self.dropped_clients += 1
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close(client.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for a single client, in order with broadcasts."""
+        client = self.active_connections.get(websocket)
+        if client:
+            self._enqueue(client, dumps_text(message))
+
+    async def send_encoded(self, websocket: WebSocket, text: str):
+        """Queue an already-encoded JSON message for a single client."""
+        client = self.active_connections.get(websocket)
+        if client:
+            self._enqueue(client, text)
+
+    async def broadcast(self, message: dict):
+        text = dumps_text(message)
+        for client in list(self.active_connections.values()):
+            self._enqueue(client, text)
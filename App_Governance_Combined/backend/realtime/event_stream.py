@@ -0,0 +1,60 @@
+# realtime/event_stream.py
+import copy
+from collections import deque
+from typing import Dict, List, Optional
+
+class EventStream:
+    """Sequenced ticket change events with a bounded replay buffer.
+
+    Every event gets a monotonically increasing ``seq``. Reconnecting
+    clients pass the last seq they saw and get only the events after it, as
+    long as those are still in the ring buffer; otherwise they must reload a
+    full snapshot.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.seq = 0
+        self._buffer = deque(maxlen=capacity)
+        # ticket_id -> top-level fields as last published (stages excluded)
+        self._published: Dict[str, dict] = {}
+
+    def append(self, event: dict) -> dict:
+        self.seq += 1
+        event["seq"] = self.seq
+        self._buffer.append(event)
+        return event
+
+    def since(self, last_seq: int) -> Optional[List[dict]]:
+        """Events after last_seq, or None if some of them were already evicted."""
+        if last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self._buffer or self._buffer[0]["seq"] > last_seq + 1:
+            return None
+        return [event for event in self._buffer if event["seq"] > last_seq]
+
+    def track(self, ticket: dict):
+        """Record a ticket as fully known to clients (e.g. sent in a snapshot)."""
+        self._published[ticket["id"]] = {k: v for k, v in ticket.items() if k != "stages"}
+
+    def ticket_added(self, ticket: dict) -> dict:
+        """Publish a ticket clients haven't seen yet, with all of its fields."""
+        self.track(ticket)
+        # Snapshot it: replaying a live dict would put later state before older deltas
+        return self.append({"type": "ticket_added", "id": ticket["id"], "ticket": copy.deepcopy(ticket)})
+
+    def ticket_delta(self, ticket: dict, stage_index: int = None) -> dict:
+        """Publish the fields of ticket that changed since it was last published."""
+        previous = self._published.get(ticket["id"], {})
+        current = {k: v for k, v in ticket.items() if k != "stages"}
+        event = {
+            "type": "ticket_delta",
+            "id": ticket["id"],
+            "changes": {k: v for k, v in current.items() if previous.get(k, object()) != v},
+        }
+        if stage_index is not None:
+            stage = ticket["stages"][stage_index]
+            event["stage"] = {"index": stage_index, "status": stage["status"], "message": stage["message"]}
+        self._published[ticket["id"]] = current
+        return self.append(event)
@@ -0,0 +1,95 @@
+# realtime/json_codec.py
+import json
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from fastapi.responses import JSONResponse, Response
+
+from metrics.registry import TICKET_JSON_CACHE
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, encoded with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def dumps_text(content: Any) -> str:
+    """dumps() as str, for WebSocket text frames."""
+    return dumps(content).decode("utf-8")
+
+def encoder_name() -> str:
+    return "orjson" if orjson is not None else "json"
+
+def join_object(key: str, items: List[bytes], rest: dict = None) -> bytes:
+    """``{key: [items...], **rest}`` from already-encoded items, with a single join."""
+    head = b"{" + dumps(key) + b":["
+    tail = b"]" + (b"," + dumps(rest)[1:-1] if rest else b"") + b"}"
+    if len(items) < 2:
+        return head + b"".join(items) + tail
+    # Only the first and last items are copied to attach the envelope
+    return b",".join([head + items[0], *items[1:-1], items[-1] + tail])
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps() (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class EncodedJSONResponse(Response):
+    """Response whose body is JSON that has already been encoded."""
+
+    media_type = "application/json"
+
+class TicketJSONCache:
+    """Encoded JSON bytes per ticket and view, reused until the ticket changes.
+
+    Ticket dicts are mutated in place by the pipeline, so whoever changes a
+    ticket calls ``invalidate`` (``update_stage_progress`` does for every
+    stage update); the next read re-encodes it once.
+    """
+
+    def __init__(self):
+        self._encoded: Dict[str, Dict[str, bytes]] = {}
+
+    def _lookup(self, ticket_id: str, ticket: dict, view: str, project: Callable) -> Tuple[bytes, bool]:
+        views = self._encoded.get(ticket_id)
+        if views is None:
+            views = self._encoded[ticket_id] = {}
+        data = views.get(view)
+        if data is not None:
+            return data, True
+        data = views[view] = dumps(project(ticket) if project else ticket)
+        return data, False
+
+    def encode(self, ticket_id: str, ticket: dict, view: str = "full", project: Callable = None) -> bytes:
+        data, hit = self._lookup(ticket_id, ticket, view, project)
+        TICKET_JSON_CACHE.inc(result="hit" if hit else "miss")
+        return data
+
+    def encode_many(self, tickets: Iterable[Tuple[str, dict]], view: str = "full",
+                    project: Callable = None) -> List[bytes]:
+        """Encoded JSON of each ticket, re-encoding only the ones that changed."""
+        parts, hits = [], 0
+        for ticket_id, ticket in tickets:
+            data, hit = self._lookup(ticket_id, ticket, view, project)
+            parts.append(data)
+            hits += hit
+        # One counter update per call rather than per ticket
+        if hits:
+            TICKET_JSON_CACHE.inc(hits, result="hit")
+        if len(parts) > hits:
+            TICKET_JSON_CACHE.inc(len(parts) - hits, result="miss")
+        return parts
+
+    def invalidate(self, ticket_id: str):
+        self._encoded.pop(ticket_id, None)
+
+    def clear(self):
+        self._encoded.clear()
+
+    def __len__(self) -> int:
+        return len(self._encoded)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class Ticket(BaseModel):
     ticket_id: str
@@ -11,11 +11,17 @@ class Ticket(BaseModel):
     created_on: str
     description: str
     arm_id: str
-    application_name: str
-    application_owner: str
-    lob_owner: str
-    ait_owner: str
-    contacts: List[str]
+    # Ownership fields are filled in by the AppHQ enrichment stage
+    application_name: Optional[str] = None
+    application_owner: Optional[str] = None
+    lob_owner: Optional[str] = None
+    ait_owner: Optional[str] = None
+    contacts: List[str] = []
 
 class TicketResponse(BaseModel):
     tickets: List[Ticket]
+
+    @classmethod
+    def of(cls, tickets: List[Ticket]) -> "TicketResponse":
+        """Wrap tickets that were already validated (at ingest or the API) without re-validating them."""
+        return cls.model_construct(tickets=tickets)
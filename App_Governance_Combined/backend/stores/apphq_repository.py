@@ -0,0 +1,60 @@
+# stores/apphq_repository.py
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+DEFAULT_APPHQ_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "resources", "apphq_data.json"
+)
+
+class AppHQRepository:
+    """AppHQ ownership records indexed by ait_number.
+
+    The file is parsed once and re-read only when its mtime changes, so a
+    lookup is a dict access instead of a scan over every AIT.
+    """
+
+    def __init__(self, data_file: str = None):
+        self.data_file = os.path.abspath(data_file or DEFAULT_APPHQ_FILE)
+        self._records: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.stat(self.data_file).st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.data_file, "r") as f:
+                records = json.load(f)
+            self._records = {rec["ait_number"]: rec for rec in records if rec.get("ait_number")}
+            self._mtime = mtime
+
+    def lookup(self, ait_number: str) -> Optional[dict]:
+        """Return the AppHQ record for one AIT, or None if unknown."""
+        self._refresh()
+        return self._records.get(ait_number)
+
+    def lookup_many(self, ait_numbers: Iterable[str]) -> Dict[str, dict]:
+        """Return {ait_number: record} for every known AIT in ait_numbers."""
+        self._refresh()
+        records = self._records
+        return {ait: records[ait] for ait in set(ait_numbers) if ait in records}
+
+    def __len__(self):
+        self._refresh()
+        return len(self._records)
+
+_repositories: Dict[str, AppHQRepository] = {}
+_repositories_lock = threading.Lock()
+
+def get_apphq_repository(data_file: str = None) -> AppHQRepository:
+    """Return the shared repository for data_file (one instance per path)."""
+    path = os.path.abspath(data_file or DEFAULT_APPHQ_FILE)
+    with _repositories_lock:
+        if path not in _repositories:
+            _repositories[path] = AppHQRepository(path)
+        return _repositories[path]
@@ -0,0 +1,224 @@
+# stores/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from pydantic import BaseModel
+
+# Hash of the ticket payload the current stage call is working on. The agent
+# prompt does not contain the tickets themselves, so the orchestrator sets
+# this around every agent-mode call to keep different batches apart.
+ticket_fingerprint: ContextVar[str] = ContextVar("ticket_fingerprint", default="")
+
+def fingerprint_payload(*args, **kwargs) -> str:
+    """Stable hash of a stage call's arguments (Pydantic models included)."""
+    digest = hashlib.sha256()
+    for value in (*args, *sorted(kwargs.items())):
+        if isinstance(value, BaseModel):
+            digest.update(value.model_dump_json().encode())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+# Message fields that differ between a live response and its cached replay
+# (e.g. usage_metadata gains "total_cost": 0), plus ToolMessage.artifact, which
+# is never sent to the model (it can hold timestamps); none may change the key
+VOLATILE_MESSAGE_FIELDS = ("usage_metadata", "response_metadata", "id", "artifact")
+
+def _strip_volatile(value):
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    if isinstance(value, dict):
+        if value.get("type") == "constructor" and isinstance(value.get("kwargs"), dict):
+            # Serialized message: its top-level "id" is the class path, kwargs["id"] the message id
+            kwargs = {k: _strip_volatile(v) for k, v in value["kwargs"].items() if k not in VOLATILE_MESSAGE_FIELDS}
+            return {**value, "kwargs": kwargs}
+        return {k: _strip_volatile(v) for k, v in value.items()}
+    return value
+
+def normalize_prompt(prompt: str) -> str:
+    """The serialized message list without per-response metadata and message ids."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    return json.dumps(_strip_volatile(messages), sort_keys=True)
+
+def _dump_generations(generations: RETURN_VAL_TYPE) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message)} if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+def _load_generations(text: str) -> RETURN_VAL_TYPE:
+    return [
+        ChatGeneration(message=messages_from_dict([g["message"]])[0]) if "message" in g else Generation(text=g["text"])
+        for g in json.loads(text)
+    ]
+
+class CountingCache(BaseCache):
+    """LLM response cache keyed on model config, prompt, tools and ticket payload.
+
+    ``llm_string`` already carries the model parameters and bound tools;
+    ``prompt`` is the serialized message list, normalized so a replayed
+    response hashes like the live one. Subclasses store entries
+    under the combined key and expire them after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cache_key(self, prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256()
+        for part in (llm_string, normalize_prompt(prompt), ticket_fingerprint.get()):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _record(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+class InMemoryLRUCache(CountingCache):
+    """In-process LRU cache with TTL."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_entries, ttl_seconds)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return self._record(entry[1] if entry else None)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self.cache_key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = (time.time(), return_val)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteLLMCache(CountingCache):
+    """On-disk LLM cache so repeat runs survive restarts."""
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_entries, ttl_seconds)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.cache_key(prompt, llm_string)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[1]):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return self._record(_load_generations(row[0]) if row else None)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self.cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, _dump_generations(return_val), now, now)
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                # Evict the least recently used entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+
+    def clear(self, **kwargs) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+def create_llm_cache(config: dict) -> Optional[CountingCache]:
+    """Build the LLM cache described by the "llm_cache" config section."""
+    backend = config.get("backend", "none")
+    max_entries = config.get("max_entries", 10000)
+    ttl_seconds = config.get("ttl_seconds")
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryLRUCache(max_entries, ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteLLMCache(config.get("path", "state/llm_cache.db"), max_entries, ttl_seconds)
+    raise ValueError(f"Unknown LLM cache backend: {backend}")
@@ -0,0 +1,148 @@
+# stores/ticket_state.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Tuple
+
+class TicketStateStore(MutableMapping):
+    """Dict-like store for frontend ticket state (the in-memory backend).
+
+    Ticket dicts are mutated in place by the pipeline, so callers mark a
+    ticket dirty after changing it; persistent backends write dirty tickets
+    on the next flush. ``version`` increases on every change and can be
+    used to tell whether anything changed since a previous read.
+    """
+
+    def __init__(self):
+        self._tickets: Dict[str, dict] = {}
+        self.version = 0
+
+    def __getitem__(self, ticket_id: str) -> dict:
+        return self._tickets[ticket_id]
+
+    def __setitem__(self, ticket_id: str, ticket: dict):
+        self._tickets[ticket_id] = ticket
+        self.mark_dirty(ticket_id)
+
+    def __delitem__(self, ticket_id: str):
+        del self._tickets[ticket_id]
+        self.mark_dirty(ticket_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tickets)
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, ticket_id) -> bool:
+        return ticket_id in self._tickets
+
+    def mark_dirty(self, ticket_id: str):
+        self.version += 1
+
+    def load(self) -> int:
+        """Restore persisted tickets; returns how many were loaded."""
+        return 0
+
+    async def flush_async(self):
+        pass
+
+    async def run_flusher(self):
+        pass
+
+    def close(self):
+        pass
+
+class SQLiteTicketStateStore(TicketStateStore):
+    """Ticket state persisted to SQLite with write-ahead batching.
+
+    Updates only mark tickets dirty; a background flusher writes every dirty
+    ticket in a single transaction each ``flush_interval_ms``, so a burst of
+    stage updates costs one commit. The database runs in WAL mode so a crash
+    loses at most the last unflushed interval.
+    """
+
+    def __init__(self, path: str, flush_interval_ms: float = 200):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets (ticket_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._dirty = set()
+
+    def mark_dirty(self, ticket_id: str):
+        super().mark_dirty(ticket_id)
+        self._dirty.add(ticket_id)
+
+    def load(self) -> int:
+        with self._lock:
+            rows = self._conn.execute("SELECT ticket_id, data FROM tickets").fetchall()
+        for ticket_id, data in rows:
+            self._tickets[ticket_id] = json.loads(data)
+        return len(rows)
+
+    def _collect(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str]]]:
+        # Serialize on the caller's thread so tickets aren't read while being mutated
+        dirty, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for ticket_id in dirty:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None:
+                deletes.append((ticket_id,))
+            else:
+                upserts.append((ticket_id, json.dumps(ticket)))
+        return upserts, deletes
+
+    def _write(self, upserts: List[Tuple[str, str]], deletes: List[Tuple[str]]):
+        with self._lock, self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tickets (ticket_id, data) VALUES (?, ?)", upserts
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM tickets WHERE ticket_id = ?", deletes)
+
+    def flush(self):
+        """Write all dirty tickets in one transaction."""
+        if self._dirty:
+            self._write(*self._collect())
+
+    async def flush_async(self):
+        if self._dirty:
+            await asyncio.to_thread(self._write, *self._collect())
+
+    async def run_flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                print(f"Error flushing ticket state: {e}")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+def create_ticket_state_store(config: dict) -> TicketStateStore:
+    """Build the ticket state store described by the "state_store" config section."""
+    backend = config.get("backend", "memory")
+    if backend == "memory":
+        return TicketStateStore()
+    if backend == "sqlite":
+        return SQLiteTicketStateStore(
+            config.get("path", "state/ticket_state.db"),
+            flush_interval_ms=config.get("flush_interval_ms", 200)
+        )
+    raise ValueError(f"Unknown state store backend: {backend}")
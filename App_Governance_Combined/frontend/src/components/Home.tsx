@@ -27,6 +27,7 @@ interface Ticket {
   currentStage: number;
   stages: Stage[];
   waitingForReview?: boolean;
+  waitingSince?: string | null;
   aitNumber?: string;
   deliverableType?: string;
   category?: string;
@@ -38,10 +39,40 @@ interface Ticket {
   contacts?: string[];
 }
 
+interface TicketDelta {
+  type: 'ticket_delta';
+  seq: number;
+  id: string;
+  changes: Partial<Ticket>;
+  stage?: { index: number; status: Stage['status']; message: string };
+}
+
+interface TicketAdded {
+  type: 'ticket_added';
+  seq: number;
+  id: string;
+  ticket: Ticket;
+}
+
+type TicketEvent = TicketDelta | TicketAdded;
+
+const applyTicketDelta = (ticket: Ticket, delta: TicketDelta): Ticket => ({
+  ...ticket,
+  ...delta.changes,
+  stages: delta.stage
+    ? ticket.stages.map((stage, index) =>
+        index === delta.stage!.index
+          ? { ...stage, status: delta.stage!.status, message: delta.stage!.message }
+          : stage
+      )
+    : ticket.stages,
+});
+
 export default function Home({ currentUser, onSignOut }: HomeProps) {
   const navigate = useNavigate();
   const { ticketId } = useParams();
   const wsRef = useRef<WebSocket | null>(null);
+  const lastSeqRef = useRef<number | null>(null);
 
   const [tickets, setTickets] = useState<Ticket[]>([]);
   const [selectedTicket, setSelectedTicket] = useState<Ticket | null>(null);
@@ -50,8 +81,28 @@ export default function Home({ currentUser, onSignOut }: HomeProps) {
 
   // WebSocket connection
   useEffect(() => {
+    const applyDelta = (delta: TicketEvent) => {
+      if (lastSeqRef.current !== null && delta.seq <= lastSeqRef.current) {
+        return;
+      }
+      lastSeqRef.current = delta.seq;
+      if (delta.type === 'ticket_added') {
+        // Tickets fetched after the snapshot: append unknown IDs, replace known ones
+        setTickets((prev) =>
+          prev.some((t) => t.id === delta.id)
+            ? prev.map((t) => (t.id === delta.id ? delta.ticket : t))
+            : [...prev, delta.ticket]
+        );
+        return;
+      }
+      setTickets((prev) => prev.map((t) => (t.id === delta.id ? applyTicketDelta(t, delta) : t)));
+      setSelectedTicket((prev) => (prev && prev.id === delta.id ? applyTicketDelta(prev, delta) : prev));
+    };
+
     const connectWebSocket = () => {
-      const ws = new WebSocket('ws://localhost:8000/ws');
+      // Resume from the last sequence number so the server only replays missed updates
+      const since = lastSeqRef.current !== null ? `?since=${lastSeqRef.current}` : '';
+      const ws = new WebSocket(`ws://localhost:8000/ws${since}`);
 
       ws.onopen = () => {
         console.log('WebSocket connected');
@@ -68,6 +119,26 @@ export default function Home({ currentUser, onSignOut }: HomeProps) {
             if (data.tickets && data.tickets.length > 0) {
               setTickets(data.tickets);
             }
+            if (typeof data.seq === 'number') {
+              lastSeqRef.current = data.seq;
+            }
+            break;
+
+          case 'replay':
+            data.events.forEach(applyDelta);
+            break;
+
+          case 'ticket_delta':
+          case 'ticket_added':
+            applyDelta(data);
+            break;
+
+          case 'ticket_deltas':
+            // Several ticket changes coalesced into one message (e.g. bulk review approval, a fetched chunk)
+            data.events.forEach(applyDelta);
+            if (data.message) {
+              setStatusMessage(data.message);
+            }
             break;
 
           case 'ticket_update':